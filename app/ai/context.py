@@ -0,0 +1,187 @@
+import hashlib
+from collections import Counter
+from pydantic import BaseModel, Field
+from pydantic_core import to_json
+from app.core.config import (
+    CONTEXT_DELTA_WINDOW,
+    CONTEXT_PROMPT_FORMAT,
+    CONTEXT_REASONING_WINDOW,
+    CONTEXT_TOKEN_BUDGET,
+)
+from app.llm.scheduler import estimate_tokens
+from app.ai.encoding import PromptFormat, encode_deltas, encode_entries, encode_object
+from app.models.graph import (
+    MiniCDSSState,
+    PromptContext,
+    ReasoningStep,
+    RelevanceStatus,
+)
+
+## State fields that agents inline into their prompts
+CONTEXT_FIELDS = (
+    "positive_evidence",
+    "negative_evidence",
+    "diagnoses",
+    "reasoning_chain",
+    "diagnosis_strategy",
+    "evidence_delta",
+    "diagnoses_delta",
+)
+
+## Rendered PromptContext fields (reasoning_chain also yields reasoning_summary)
+PROMPT_FIELDS = CONTEXT_FIELDS + ("reasoning_summary",)
+
+SUMMARY_THOUGHTS = 3  # older thoughts quoted in the reasoning summary
+SUMMARY_THOUGHT_CHARS = 160
+
+
+class ContextBudget(BaseModel):
+    name: str = Field(description="Agent this budget belongs to (used for stats)")
+    max_tokens: int = Field(
+        default=CONTEXT_TOKEN_BUDGET,
+        gt=0,
+        description="Estimated token ceiling for the clinical state inlined into the prompt",
+    )
+
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def context_stats() -> dict:
+    return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def _fingerprint(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _recent(entries: list, window: int) -> list:
+    return entries[-window:] if window > 0 else []
+
+
+def summarize_reasoning(steps: list[ReasoningStep]) -> str:
+    """Rolls reasoning steps that left the window into one bounded line."""
+    if not steps:
+        return ""
+    actions = ", ".join(
+        f"{action} x{count}"
+        for action, count in Counter(step.action_taken for step in steps).items()
+    )
+    thoughts = " | ".join(
+        step.thought.strip()[:SUMMARY_THOUGHT_CHARS]
+        for step in steps[-SUMMARY_THOUGHTS:]
+    )
+    return f"{len(steps)} earlier steps ({actions}). Most recent of them: {thoughts}"
+
+
+def _render(
+    state: MiniCDSSState,
+    field: str,
+    fmt: PromptFormat,
+    reasoning_window: int = CONTEXT_REASONING_WINDOW,
+    delta_window: int = CONTEXT_DELTA_WINDOW,
+) -> dict[str, str]:
+    value = getattr(state, field)
+    if field == "diagnosis_strategy":
+        return {field: encode_object(value, fmt)}
+    if field == "reasoning_chain":
+        split = max(len(value) - reasoning_window, 0)
+        return {
+            "reasoning_summary": summarize_reasoning(value[:split]),
+            field: encode_entries(value[split:], fmt),
+        }
+    if field in ("evidence_delta", "diagnoses_delta"):
+        return {field: encode_deltas(_recent(value, delta_window), fmt)}
+    ## Redundant entries no longer inform the differential; deltas still carry removals
+    return {
+        field: encode_entries(
+            [e for e in value if e.relevance != RelevanceStatus.REDUNDANT], fmt
+        )
+    }
+
+
+### Builds the prompt context once per run, re-rendering only fields that changed
+def build_prompt_context(
+    state: MiniCDSSState, fmt: PromptFormat = CONTEXT_PROMPT_FORMAT
+) -> PromptContext:
+    previous = state.prompt_context
+    if previous is not None and previous.encoding != fmt:
+        previous = None
+    ## Rust-side JSON dump is far cheaper than the Python-side prompt rendering
+    raw = {field: to_json(getattr(state, field)) for field in CONTEXT_FIELDS}
+    fingerprints = {field: _fingerprint(dump) for field, dump in raw.items()}
+
+    if previous is not None and previous.fingerprints == fingerprints:
+        return previous
+
+    rendered: dict[str, str] = {}
+    for field in CONTEXT_FIELDS:
+        if (
+            previous is not None
+            and previous.fingerprints.get(field) == fingerprints[field]
+        ):
+            rendered[field] = getattr(previous, field)
+            if field == "reasoning_chain":
+                rendered["reasoning_summary"] = previous.reasoning_summary
+        else:
+            rendered.update(_render(state, field, fmt))
+
+    return PromptContext(
+        fingerprints=fingerprints,
+        encoding=fmt,
+        source_tokens=sum(estimate_tokens(dump.decode()) for dump in raw.values()),
+        **rendered,
+    )
+
+
+### Compact per-turn user message: one labelled line per input the system prompt names
+def state_payload(**sections: object) -> str:
+    return "\n".join(f"{name}: {value}" for name, value in sections.items())
+
+
+def context_tokens(context: PromptContext) -> int:
+    return sum(estimate_tokens(getattr(context, field)) for field in PROMPT_FIELDS)
+
+
+### Narrows the reasoning/delta windows until the context fits the agent's budget.
+### Active evidence and diagnoses are never trimmed: they are the clinical record.
+def _fit(
+    state: MiniCDSSState, context: PromptContext, budget: ContextBudget
+) -> PromptContext:
+    tokens = context_tokens(context)
+    reasoning_window, delta_window = CONTEXT_REASONING_WINDOW, CONTEXT_DELTA_WINDOW
+    while tokens > budget.max_tokens and (reasoning_window > 0 or delta_window > 1):
+        reasoning_window //= 2
+        delta_window = max(delta_window // 2, min(delta_window, 1))
+        windows = (context.encoding, reasoning_window, delta_window)
+        context = context.model_copy(
+            update={
+                **_render(state, "reasoning_chain", *windows),
+                **_render(state, "evidence_delta", *windows),
+                **_render(state, "diagnoses_delta", *windows),
+            }
+        )
+        tokens = context_tokens(context)
+    return context
+
+
+def fit_to_budget(
+    state: MiniCDSSState, context: PromptContext, budget: ContextBudget
+) -> PromptContext:
+    context = _fit(state, context, budget)
+    tokens = context_tokens(context)
+    saved = max(context.source_tokens - tokens, 0)
+    counts = _stats.setdefault(
+        budget.name,
+        {"calls": 0, "context_tokens": 0, "tokens_saved": 0, "over_budget": 0},
+    )
+    counts["calls"] += 1
+    counts["context_tokens"] += tokens
+    counts["tokens_saved"] += saved
+    over = tokens > budget.max_tokens
+    counts["over_budget"] += over
+    print(
+        f"{budget.name} context: ~{tokens} tokens (~{saved} saved)"
+        + (f", over its {budget.max_tokens} budget" if over else "")
+    )
+    return context
@@ -1,6 +1,28 @@
-from app.models.graph import DifferentialDiagnosisAgentOutput, DiagnosisAuditerOutput
+from app.models.graph import (
+    DifferentialDiagnosisAgentOutput,
+    DiagnosisAuditerOutput,
+    PromptContext,
+)
 
+from app.core.config import DIAGNOSIS_CONTEXT_TOKEN_BUDGET
 from app.llm.builder import LLMProviderFactory
+from app.llm.base import PartialCallback
+from app.llm.schemas import register_schemas
+from app.llm.router import RoutingPolicy
+from app.llm.prefix import register_system_prompt
+from app.ai.context import ContextBudget, state_payload
+
+register_schemas(DiagnosisAuditerOutput)
+
+DIAGNOSIS_AUDITER_ROUTING_POLICY = RoutingPolicy(
+    name="diagnosis_auditer",
+    primary="groq-120B",
+    fallbacks=["google", "groq-20B"],
+)
+
+DIAGNOSIS_AUDITER_CONTEXT_BUDGET = ContextBudget(
+    name="diagnosis_auditer", max_tokens=DIAGNOSIS_CONTEXT_TOKEN_BUDGET
+)
 
 DIAGNOSIS_AUDITER_PROMPT = """
 You are the **Diagnosis Builder & Diagnosis Auditer Agent** in a
@@ -48,21 +70,27 @@ You MUST treat:
 INPUTS YOU RECEIVE
 =========================
 
-You are given the COMPLETE READ-ONLY clinical state:
+You are given the COMPLETE READ-ONLY clinical state, as labelled lines
+(LABEL: value) in the user message:
 
-- INITIAL_PATIENT_NOTES : {INITIAL_PATIENT_NOTES}
-- POSITIVE_EVIDENCE : {POSITIVE_EVIDENCE}
-- NEGATIVE_EVIDENCE : {NEGATIVE_EVIDENCE}
-- DIAGNOSES (Doctor + AI) : {DIAGNOSES}
-- REASONING_CHAIN : {REASONING_CHAIN}
-- DIAGNOSIS_SUMMARY : {DIAGNOSIS_SUMMARY}
-- DIAGNOSIS_STRATEGY : {DIAGNOSIS_STRATEGY}
-- EVIDENCE_DELTA : {EVIDENCE_DELTA}
-- DIAGNOSES_DELTA : {DIAGNOSES_DELTA}
+- INITIAL_PATIENT_NOTES
+- POSITIVE_EVIDENCE
+- NEGATIVE_EVIDENCE
+- DIAGNOSES (Doctor + AI)
+- REASONING_CHAIN
+- REASONING_SUMMARY
+- DIAGNOSIS_SUMMARY
+- DIAGNOSIS_STRATEGY
+- EVIDENCE_DELTA
+- DIAGNOSES_DELTA
 
 And orchestration instructions via:
 
-- DIAGNOSIS_AUDITER_COMMANDS  : {DIAGNOSIS_AUDITER_COMMANDS}
+- DIAGNOSIS_AUDITER_COMMANDS
+
+Entries are compact JSON or "|"-separated tables with a header row. Fields at
+their default are omitted or left blank (relevance = Active, differential_status =
+Expanding, empty text or lists).
 
 =========================
 META IS AUTHORITATIVE
@@ -188,40 +216,57 @@ CLINICAL SAFETY PRINCIPLES
 You are the diagnostic quality controller.
 Act like a senior attending reviewing resident assessments.
 """
+register_system_prompt("diagnosis_auditer", DIAGNOSIS_AUDITER_PROMPT)
 
 
-async def audit_diagnoses(
+### User message for one auditer call (also measured by the encoding benchmark)
+def diagnosis_payload(
     differential_diagnosis_output: DifferentialDiagnosisAgentOutput,
+    context: PromptContext,
     initial_patient_notes: str,
-    positive_evidence: list = [],
-    negative_evidence: list = [],
-    diagnoses: list = [],
-    reasoning_chain: list = [],
     diagnosis_summary: str = "",
-    diagnosis_strategy: dict = {},
-    evidence_delta: list = [],
-    diagnoses_delta: list = [],
-):
-
-    if differential_diagnosis_output.diagnosis_auditer_meta.should_run:
+) -> str:
+    prompt_load = {
+        "INITIAL_PATIENT_NOTES": initial_patient_notes,
+        "POSITIVE_EVIDENCE": context.positive_evidence,
+        "NEGATIVE_EVIDENCE": context.negative_evidence,
+        "DIAGNOSES": context.diagnoses,
+        "REASONING_CHAIN": context.reasoning_chain,
+        "REASONING_SUMMARY": context.reasoning_summary,
+        "DIAGNOSIS_SUMMARY": diagnosis_summary,
+        "DIAGNOSIS_STRATEGY": context.diagnosis_strategy,
+        "EVIDENCE_DELTA": context.evidence_delta,
+        "DIAGNOSES_DELTA": context.diagnoses_delta,
+        "DIAGNOSIS_AUDITER_COMMANDS": differential_diagnosis_output.model_dump_json(),
+    }
+
+    return state_payload(**prompt_load)
 
-        prompt_load = {
-            "DIAGNOSIS_AUDITER_COMMANDS": differential_diagnosis_output.model_dump(),
-            "INITIAL_PATIENT_NOTES": initial_patient_notes,
-            "POSITIVE_EVIDENCE": positive_evidence,
-            "NEGATIVE_EVIDENCE": negative_evidence,
-            "DIAGNOSES": diagnoses,
-            "REASONING_CHAIN": reasoning_chain,
-            "DIAGNOSIS_SUMMARY": diagnosis_summary,
-            "DIAGNOSIS_STRATEGY": diagnosis_strategy,
-            "EVIDENCE_DELTA": evidence_delta,
-            "DIAGNOSES_DELTA": diagnoses_delta,
-        }
 
-        prompt = DIAGNOSIS_AUDITER_PROMPT.format(**prompt_load)
-
-        llm = LLMProviderFactory.groq(params="120B")
-
-        result = await llm.invoke(prompt, DiagnosisAuditerOutput)
-        print(result.model_dump_json(indent=2))
-        return result
+async def audit_diagnoses(
+    differential_diagnosis_output: DifferentialDiagnosisAgentOutput,
+    context: PromptContext,
+    initial_patient_notes: str,
+    diagnosis_summary: str = "",
+    on_partial: PartialCallback | None = None,
+):
+    prompt = diagnosis_payload(
+        differential_diagnosis_output, context, initial_patient_notes, diagnosis_summary
+    )
+
+    llm = LLMProviderFactory.routed(DIAGNOSIS_AUDITER_ROUTING_POLICY)
+
+    result = (
+        await llm.invoke_streaming(
+            prompt,
+            DiagnosisAuditerOutput,
+            on_partial,
+            system_prompt=DIAGNOSIS_AUDITER_PROMPT,
+        )
+        if on_partial
+        else await llm.invoke(
+            prompt, DiagnosisAuditerOutput, system_prompt=DIAGNOSIS_AUDITER_PROMPT
+        )
+    )
+    print(result.model_dump_json(indent=2))
+    return result
@@ -1,8 +1,26 @@
-from app.models.graph import DifferentialDiagnosisAgentOutput
+from app.models.graph import DifferentialDiagnosisAgentOutput, PromptContext
 
+from app.core.config import DIFFERENTIAL_CONTEXT_TOKEN_BUDGET, GRAPH_LOCAL_RESCORING
 from app.llm.builder import LLMProviderFactory
+from app.llm.base import PartialCallback
+from app.llm.schemas import register_schemas
+from app.llm.router import RoutingPolicy
+from app.llm.prefix import register_system_prompt
+from app.ai.context import ContextBudget, state_payload
 
-DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT = """
+register_schemas(DifferentialDiagnosisAgentOutput)
+
+DIFFERENTIAL_ROUTING_POLICY = RoutingPolicy(
+    name="differential_diagnosis",
+    primary="groq-120B",
+    fallbacks=["groq-20B", "google"],
+)
+
+DIFFERENTIAL_CONTEXT_BUDGET = ContextBudget(
+    name="differential_diagnosis", max_tokens=DIFFERENTIAL_CONTEXT_TOKEN_BUDGET
+)
+
+DIFFERENTIAL_DIAGNOSIS_AGENT_TEMPLATE = """
 You are the **Differential Diagnosis Agent (Chief Medical Brain)** of a
 Mini Clinical Decision Support System (MiniCDSS).
 
@@ -36,24 +54,30 @@ You are the ONLY agent allowed to:
 INPUTS YOU RECEIVE
 =========================
 
+Each input arrives in the user message as a labelled line (LABEL: value).
+Entries are compact JSON or "|"-separated tables with a header row. Fields at
+their default are omitted or left blank (relevance = Active, differential_status =
+Expanding, empty text or lists).
+
 Core Clinical State:
-- {POSITIVE_EVIDENCE}: Active positive clinical evidence (Doctor + AI)
-- {NEGATIVE_EVIDENCE}: Active negative clinical evidence (Doctor + AI)
-- {DIAGNOSES}: Active diagnoses (Doctor + AI)
-- {REASONING_CHAIN}: Prior brain-level reasoning steps (may be empty)
-- {DIAGNOSIS_SUMMARY}: Longitudinal diagnostic narrative (may be empty)
-- {DIAGNOSIS_STRATEGY}: Previous diagnostic strategy (may be empty)
+- POSITIVE_EVIDENCE: Active positive clinical evidence (Doctor + AI)
+- NEGATIVE_EVIDENCE: Active negative clinical evidence (Doctor + AI)
+- DIAGNOSES: Active diagnoses (Doctor + AI)
+- REASONING_CHAIN: Prior brain-level reasoning steps (may be empty)
+- REASONING_SUMMARY: Roll-up of older reasoning steps not listed above (may be empty)
+- DIAGNOSIS_SUMMARY: Longitudinal diagnostic narrative (may be empty)
+- DIAGNOSIS_STRATEGY: Previous diagnostic strategy (may be empty)
 
 Change Context (Most Important):
-- {LAST_MUTATION_SOURCE}:
+- LAST_MUTATION_SOURCE:
     * "UI"
     * "Start_Diagnosis"
 
-- {EVIDENCE_DELTA}: Evidence added / updated / marked redundant by doctor this turn
-- {DIAGNOSES_DELTA}: Diagnoses added / updated / marked redundant by doctor this turn
+- EVIDENCE_DELTA: Evidence added / updated / marked redundant by doctor this turn
+- DIAGNOSES_DELTA: Diagnoses added / updated / marked redundant by doctor this turn
 
 Doctor Interaction:
-- {DOCTOR_LAST_CHAT}: Latest free-form message from the Doctor (may be empty)
+- DOCTOR_LAST_CHAT: Latest free-form message from the Doctor (may be empty)
 
 =========================
 YOUR CORE RESPONSIBILITIES
@@ -192,7 +216,7 @@ When constructing DiagnosisAuditerMeta, you MUST specify:
     * GenerateDoctorAdvisory
 - Which AI diagnoses may be updated or marked redundant
 - A clear diagnostic objective
-
+{LOCAL_RESCORING}
 Diagnosis Auditer guarantees:
 - Doctor diagnosis name and reasoning are never overridden
 - Confidence metrics may be updated for all diagnoses
@@ -232,38 +256,70 @@ You are the stabilizing intelligence of this system.
 Act like a senior clinician supervising junior residents.
 """
 
+## Only true when the graph rescores UpdateConfidenceMetrics-only audits locally
+LOCAL_RESCORING_INSTRUCTION = """
+If only confidence needs recalibration (evidence links are already right),
+allow ONLY UpdateConfidenceMetrics: the metrics are then recomputed
+deterministically from the evidence links without running the auditer.
+"""
 
-async def carry_diagnosis(
-    initial_patient_notes: str = "",
+DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT = DIFFERENTIAL_DIAGNOSIS_AGENT_TEMPLATE.format(
+    LOCAL_RESCORING=LOCAL_RESCORING_INSTRUCTION if GRAPH_LOCAL_RESCORING else ""
+)
+register_system_prompt("differential_diagnosis", DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT)
+
+
+### User message for one differential call (also measured by the encoding benchmark)
+def differential_payload(
+    context: PromptContext,
     last_mutation_source: str = "",
-    positive_evidence: list = [],
-    negative_evidence: list = [],
-    diagnoses: list = [],
-    reasoning_chain: list = [],
     diagnosis_summary: str = "",
-    diagnosis_strategy: dict = {},
     doctor_last_chat: str = "",
-    evidence_delta: list = [],
-    diagnoses_delta: list = [],
-):
+) -> str:
     prompt_load = {
-        "INTIAL_PATIENT_NOTES": initial_patient_notes,
-        "POSITIVE_EVIDENCE": positive_evidence,
-        "NEGATIVE_EVIDENCE": negative_evidence,
-        "DIAGNOSES": diagnoses,
-        "REASONING_CHAIN": reasoning_chain,
+        "POSITIVE_EVIDENCE": context.positive_evidence,
+        "NEGATIVE_EVIDENCE": context.negative_evidence,
+        "DIAGNOSES": context.diagnoses,
+        "REASONING_CHAIN": context.reasoning_chain,
+        "REASONING_SUMMARY": context.reasoning_summary,
         "DIAGNOSIS_SUMMARY": diagnosis_summary,
-        "DIAGNOSIS_STRATEGY": diagnosis_strategy,
+        "DIAGNOSIS_STRATEGY": context.diagnosis_strategy,
         "LAST_MUTATION_SOURCE": last_mutation_source,
-        "EVIDENCE_DELTA": evidence_delta,
-        "DIAGNOSES_DELTA": diagnoses_delta,
+        "EVIDENCE_DELTA": context.evidence_delta,
+        "DIAGNOSES_DELTA": context.diagnoses_delta,
         "DOCTOR_LAST_CHAT": doctor_last_chat,
     }
 
-    prompt = DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT.format(**prompt_load)
+    return state_payload(**prompt_load)
 
-    llm = LLMProviderFactory.groq(params="120B")
 
-    result = await llm.invoke(prompt, DifferentialDiagnosisAgentOutput)
+async def carry_diagnosis(
+    context: PromptContext,
+    initial_patient_notes: str = "",
+    last_mutation_source: str = "",
+    diagnosis_summary: str = "",
+    doctor_last_chat: str = "",
+    on_partial: PartialCallback | None = None,
+):
+    prompt = differential_payload(
+        context, last_mutation_source, diagnosis_summary, doctor_last_chat
+    )
+
+    llm = LLMProviderFactory.routed(DIFFERENTIAL_ROUTING_POLICY)
+
+    result = (
+        await llm.invoke_streaming(
+            prompt,
+            DifferentialDiagnosisAgentOutput,
+            on_partial,
+            system_prompt=DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT,
+        )
+        if on_partial
+        else await llm.invoke(
+            prompt,
+            DifferentialDiagnosisAgentOutput,
+            system_prompt=DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT,
+        )
+    )
     print(result.model_dump_json(indent=2))
     return result
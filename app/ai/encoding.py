@@ -0,0 +1,283 @@
+import json
+from enum import Enum
+from typing import Any, Literal, Sequence
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+###########################################################################
+# Prompt encoder for the clinical state models. Entries are written without
+# Python repr noise, without fields still at their default and with enum
+# values instead of enum reprs, either as:
+#   json  -> minified JSON array of objects
+#   table -> one header line of field names, then one "|"-separated row per
+#            entry (nested models become dotted columns, lists join with ";")
+# Ids are never stripped: the agents reference evidence and diagnoses by id.
+###########################################################################
+PromptFormat = Literal["json", "table", "repr"]  # repr: legacy, for comparison
+
+_DEFAULT_FACTORIES = (str, list, dict)
+_defaults: dict[type[BaseModel], dict[str, Any]] = {}
+
+
+def _field_defaults(model: type[BaseModel]) -> dict[str, Any]:
+    if model not in _defaults:
+        defaults = {}
+        for name, field in model.model_fields.items():
+            if field.default is not PydanticUndefined:
+                defaults[name] = field.default
+            elif field.default_factory in _DEFAULT_FACTORIES:
+                defaults[name] = field.default_factory()
+        _defaults[model] = defaults
+    return _defaults[model]
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return compact(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return [_value(item) for item in value]
+    return value
+
+
+### Model -> plain dict holding only the fields that differ from their defaults
+def compact(entry: BaseModel) -> dict[str, Any]:
+    defaults = _field_defaults(type(entry))
+    out = {}
+    for name in type(entry).model_fields:
+        value = getattr(entry, name)
+        if name in defaults and value == defaults[name]:
+            continue
+        out[name] = _value(value)
+    return out
+
+
+def _flatten(row: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, list):
+        return ";".join(_cell(item) for item in value)
+    text = (
+        json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else str(value)
+    )
+    return text.replace("|", "/").replace("\n", " ")
+
+
+def _table(rows: list[dict[str, Any]]) -> str:
+    if not rows:
+        return "(none)"
+    flat = [_flatten(row) for row in rows]
+    columns = list(dict.fromkeys(key for row in flat for key in row))
+    lines = ["|".join(columns)]
+    lines += ["|".join(_cell(row.get(col, "")) for col in columns) for row in flat]
+    return "\n" + "\n".join(lines)
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_entries(entries: Sequence[BaseModel], fmt: PromptFormat) -> str:
+    if fmt == "repr":
+        return str([entry.model_dump() for entry in entries])
+    rows = [compact(entry) for entry in entries]
+    return _table(rows) if fmt == "table" else _json(rows)
+
+
+### Deltas (added/removed lists) become one row per change, tagged by turn and op
+def encode_deltas(deltas: Sequence[BaseModel], fmt: PromptFormat) -> str:
+    if fmt != "table":
+        return encode_entries(deltas, fmt)
+    rows = [
+        {"turn": turn, "op": op, **compact(entry)}
+        for turn, delta in enumerate(deltas)
+        for op in type(delta).model_fields
+        for entry in getattr(delta, op)
+    ]
+    return _table(rows)
+
+
+## Single objects read fine as JSON in either format
+def encode_object(entry: BaseModel | None, fmt: PromptFormat) -> str:
+    if fmt == "repr":
+        return str(entry.model_dump() if entry else {})
+    return _json(compact(entry) if entry else {})
+
+
+if __name__ == "__main__":
+    ## Benchmark: python -m app.ai.encoding [session id | state.json ...]
+    ## Session ids are read from the graph checkpointer; JSON files hold a
+    ## MiniCDSSState dump. Without arguments a synthetic session is used.
+    ## Counts the full request of each agent (system prompt + its own payload)
+    ## with the o200k tokenizer of the gpt-oss models (tiktoken, dev dependency).
+    import asyncio
+    import sys
+    import tiktoken
+    from app.ai.context import build_prompt_context, _fit
+    from app.ai.differential import (
+        DIFFERENTIAL_CONTEXT_BUDGET,
+        DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT,
+        differential_payload,
+    )
+    from app.ai.evidence import (
+        EVIDENCE_AUDITER_CONTEXT_BUDGET,
+        EVIDENCE_AUDITER_PROMPT,
+        evidence_payload,
+    )
+    from app.ai.diagnosis import (
+        DIAGNOSIS_AUDITER_CONTEXT_BUDGET,
+        DIAGNOSIS_AUDITER_PROMPT,
+        diagnosis_payload,
+    )
+    from app.models.graph import (
+        ClinicalMetric,
+        Diagnosis,
+        DiagnosisAuditerMeta,
+        DifferentialDiagnosisAgentOutput,
+        Evidence,
+        EvidenceAuditerMeta,
+        EvidenceDelta,
+        MiniCDSSState,
+        ReasoningStep,
+    )
+
+    tokenizer = tiktoken.get_encoding("o200k_base")
+
+    def synthetic() -> MiniCDSSState:
+        evidence = [
+            Evidence(
+                id=f"ev_{i}",
+                creator="Doctor" if i % 3 == 0 else "AI",
+                content=f"Finding {i}: productive cough with green sputum for {i} days",
+                clinical_type="Symptom",
+                reasoning="" if i % 3 == 0 else "Extracted from the intake note",
+            )
+            for i in range(12)
+        ]
+        diagnoses = [
+            Diagnosis(
+                id=f"diag_{i}",
+                name=name,
+                creator="AI",
+                metrics=ClinicalMetric(
+                    confidence=0.6 - i / 10, support_score=3 - i, conflict_score=i
+                ),
+                reasoning=f"Supported by the respiratory findings ({name})",
+                supporting_evidence_ids=[f"ev_{j}" for j in range(i, i + 4)],
+            )
+            for i, name in enumerate(["Acute bronchitis", "Pneumonia", "Sinusitis"])
+        ]
+        steps = [
+            ReasoningStep(
+                thought=f"Turn {i}: new findings shift the differential",
+                action_taken="Trigger Both",
+            )
+            for i in range(8)
+        ]
+        commands = DifferentialDiagnosisAgentOutput(
+            current_reasoning_step=steps[-1],
+            diagnosis_summary="Likely lower respiratory tract infection",
+            evidence_auditer_meta=EvidenceAuditerMeta(
+                should_run=True,
+                reasons=["Implicit Extraction"],
+                allowed_actions=["CreateImplicitEvidence"],
+                objective="Extract findings from the latest doctor chat",
+            ),
+            diagnosis_auditer_meta=DiagnosisAuditerMeta(
+                should_run=True,
+                reasons=["Evidence-Driven Update"],
+                focus_diagnosis_ids=["diag_0", "diag_1"],
+                allowed_actions=["AttachEvidence", "UpdateConfidenceMetrics"],
+                objective="Link the new sputum findings",
+            ),
+            trigger_rationale="New evidence affects the leading diagnoses",
+        )
+        return MiniCDSSState(
+            initial_patient_notes="Productive cough for a week, low-grade fever",
+            positive_evidence=evidence[:8],
+            negative_evidence=evidence[8:],
+            diagnoses=diagnoses,
+            reasoning_chain=steps,
+            evidence_delta=[EvidenceDelta(added=evidence[:2])],
+            differential_diagnosis_output=commands,
+        )
+
+    async def load(source: str) -> MiniCDSSState:
+        if source.endswith(".json"):
+            with open(source) as f:
+                return MiniCDSSState.model_validate_json(f.read())
+        from app.workflow.graph import compiled_graph, session_config
+
+        snapshot = await compiled_graph.aget_state(session_config(source))
+        return MiniCDSSState.model_validate(snapshot.values)
+
+    ## (budget, system prompt, user message) for each agent call of a turn
+    def requests(state: MiniCDSSState, fmt: str):
+        context = build_prompt_context(state, fmt)
+        commands = (
+            state.differential_diagnosis_output
+            or synthetic().differential_diagnosis_output
+        )
+        fitted = _fit(state, context, DIFFERENTIAL_CONTEXT_BUDGET)
+        yield DIFFERENTIAL_CONTEXT_BUDGET, DIFFERENTIAL_DIAGNOSIS_AGENT_PROMPT, differential_payload(
+            fitted,
+            state.last_mutation_source,
+            state.diagnosis_summary,
+            state.doctor_last_chat,
+        )
+        for budget, system_prompt, payload in (
+            (
+                EVIDENCE_AUDITER_CONTEXT_BUDGET,
+                EVIDENCE_AUDITER_PROMPT,
+                evidence_payload,
+            ),
+            (
+                DIAGNOSIS_AUDITER_CONTEXT_BUDGET,
+                DIAGNOSIS_AUDITER_PROMPT,
+                diagnosis_payload,
+            ),
+        ):
+            yield budget, system_prompt, payload(
+                commands,
+                _fit(state, context, budget),
+                state.initial_patient_notes,
+                state.diagnosis_summary,
+            )
+
+    async def main(sources: list[str]):
+        states = [await load(source) for source in sources] or [synthetic()]
+        totals: dict[str, dict[str, int]] = {}
+        for state in states:
+            for fmt in ("repr", "json", "table"):
+                for budget, system_prompt, payload in requests(state, fmt):
+                    counts = totals.setdefault(
+                        budget.name, {"system": 0, "repr": 0, "json": 0, "table": 0}
+                    )
+                    system = len(tokenizer.encode(system_prompt))
+                    counts[fmt] += system + len(tokenizer.encode(payload))
+                    if fmt == "repr":
+                        counts["system"] += system
+
+        print(f"{len(states)} session(s), prompt tokens per agent call (o200k_base):")
+        for name, counts in totals.items():
+            saved = {
+                fmt: 1 - counts[fmt] / counts["repr"] if counts["repr"] else 0
+                for fmt in ("json", "table")
+            }
+            print(
+                f"{name:<24} system {counts['system']:6d}"
+                f"  repr {counts['repr']:7d}"
+                f"  json {counts['json']:7d} ({saved['json']:.0%} saved)"
+                f"  table {counts['table']:7d} ({saved['table']:.0%} saved)"
+            )
+
+    asyncio.run(main(sys.argv[1:]))
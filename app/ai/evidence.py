@@ -1,6 +1,28 @@
-from app.models.graph import DifferentialDiagnosisAgentOutput, EvidenceAuditerOutput
+from app.models.graph import (
+    DifferentialDiagnosisAgentOutput,
+    EvidenceAuditerOutput,
+    PromptContext,
+)
 
+from app.core.config import EVIDENCE_CONTEXT_TOKEN_BUDGET
 from app.llm.builder import LLMProviderFactory
+from app.llm.base import PartialCallback
+from app.llm.schemas import register_schemas
+from app.llm.router import RoutingPolicy
+from app.llm.prefix import register_system_prompt
+from app.ai.context import ContextBudget, state_payload
+
+register_schemas(EvidenceAuditerOutput)
+
+EVIDENCE_AUDITER_ROUTING_POLICY = RoutingPolicy(
+    name="evidence_auditer",
+    primary="groq-120B",
+    fallbacks=["google", "groq-20B"],
+)
+
+EVIDENCE_AUDITER_CONTEXT_BUDGET = ContextBudget(
+    name="evidence_auditer", max_tokens=EVIDENCE_CONTEXT_TOKEN_BUDGET
+)
 
 EVIDENCE_AUDITER_PROMPT = """
 You are the **Evidence Builder & Evidence Auditer Agent** in a
@@ -43,21 +65,27 @@ You MAY:
 INPUTS YOU RECEIVE
 =========================
 
-You are given the COMPLETE READ-ONLY clinical state:
+You are given the COMPLETE READ-ONLY clinical state, as labelled lines
+(LABEL: value) in the user message:
 
-- INITIAL_PATIENT_NOTES : {INITIAL_PATIENT_NOTES}
-- POSITIVE_EVIDENCE : {POSITIVE_EVIDENCE}
-- NEGATIVE_EVIDENCE : {NEGATIVE_EVIDENCE}
-- DIAGNOSES : {DIAGNOSES}
-- REASONING_CHAIN : {REASONING_CHAIN}
-- DIAGNOSIS_SUMMARY : {DIAGNOSIS_SUMMARY}
-- DIAGNOSIS_STRATEGY : {DIAGNOSIS_STRATEGY}
-- EVIDENCE_DELTA : {EVIDENCE_DELTA}
-- DIAGNOSES_DELTA: {DIAGNOSES_DELTA}
+- INITIAL_PATIENT_NOTES
+- POSITIVE_EVIDENCE
+- NEGATIVE_EVIDENCE
+- DIAGNOSES
+- REASONING_CHAIN
+- REASONING_SUMMARY
+- DIAGNOSIS_SUMMARY
+- DIAGNOSIS_STRATEGY
+- EVIDENCE_DELTA
+- DIAGNOSES_DELTA
 
 And orchestration instructions via:
 
-- EVIDENCE_AUDITER_COMMANDS : {EVIDENCE_AUDITER_COMMANDS}
+- EVIDENCE_AUDITER_COMMANDS
+
+Entries are compact JSON or "|"-separated tables with a header row. Fields at
+their default are omitted or left blank (relevance = Active, differential_status =
+Expanding, empty text or lists).
 
 =========================
 META IS AUTHORITATIVE
@@ -158,40 +186,57 @@ CLINICAL SAFETY PRINCIPLES
 You are the custodian of the Evidence domain.
 Act like a senior clinical data auditor.
 """
+register_system_prompt("evidence_auditer", EVIDENCE_AUDITER_PROMPT)
 
 
-async def audit_evidence(
+### User message for one auditer call (also measured by the encoding benchmark)
+def evidence_payload(
     differential_diagnosis_output: DifferentialDiagnosisAgentOutput,
+    context: PromptContext,
     initial_patient_notes: str,
-    positive_evidence: list = [],
-    negative_evidence: list = [],
-    diagnoses: list = [],
-    reasoning_chain: list = [],
     diagnosis_summary: str = "",
-    diagnosis_strategy: dict = {},
-    evidence_delta: list = [],
-    diagnoses_delta: list = [],
-):
-
-    if differential_diagnosis_output.evidence_auditer_meta.should_run:
+) -> str:
+    prompt_load = {
+        "INITIAL_PATIENT_NOTES": initial_patient_notes,
+        "POSITIVE_EVIDENCE": context.positive_evidence,
+        "NEGATIVE_EVIDENCE": context.negative_evidence,
+        "DIAGNOSES": context.diagnoses,
+        "REASONING_CHAIN": context.reasoning_chain,
+        "REASONING_SUMMARY": context.reasoning_summary,
+        "DIAGNOSIS_SUMMARY": diagnosis_summary,
+        "DIAGNOSIS_STRATEGY": context.diagnosis_strategy,
+        "EVIDENCE_DELTA": context.evidence_delta,
+        "DIAGNOSES_DELTA": context.diagnoses_delta,
+        "EVIDENCE_AUDITER_COMMANDS": differential_diagnosis_output.model_dump_json(),
+    }
+
+    return state_payload(**prompt_load)
 
-        prompt_load = {
-            "EVIDENCE_AUDITER_COMMANDS": differential_diagnosis_output.model_dump(),
-            "INITIAL_PATIENT_NOTES": initial_patient_notes,
-            "POSITIVE_EVIDENCE": positive_evidence,
-            "NEGATIVE_EVIDENCE": negative_evidence,
-            "DIAGNOSES": diagnoses,
-            "REASONING_CHAIN": reasoning_chain,
-            "DIAGNOSIS_SUMMARY": diagnosis_summary,
-            "DIAGNOSIS_STRATEGY": diagnosis_strategy,
-            "EVIDENCE_DELTA": evidence_delta,
-            "DIAGNOSES_DELTA": diagnoses_delta,
-        }
 
-        prompt = EVIDENCE_AUDITER_PROMPT.format(**prompt_load)
-
-        llm = LLMProviderFactory.groq(params="120B")
-
-        result = await llm.invoke(prompt, EvidenceAuditerOutput)
-        print(result.model_dump_json(indent=2))
-        return result
+async def audit_evidence(
+    differential_diagnosis_output: DifferentialDiagnosisAgentOutput,
+    context: PromptContext,
+    initial_patient_notes: str,
+    diagnosis_summary: str = "",
+    on_partial: PartialCallback | None = None,
+):
+    prompt = evidence_payload(
+        differential_diagnosis_output, context, initial_patient_notes, diagnosis_summary
+    )
+
+    llm = LLMProviderFactory.routed(EVIDENCE_AUDITER_ROUTING_POLICY)
+
+    result = (
+        await llm.invoke_streaming(
+            prompt,
+            EvidenceAuditerOutput,
+            on_partial,
+            system_prompt=EVIDENCE_AUDITER_PROMPT,
+        )
+        if on_partial
+        else await llm.invoke(
+            prompt, EvidenceAuditerOutput, system_prompt=EVIDENCE_AUDITER_PROMPT
+        )
+    )
+    print(result.model_dump_json(indent=2))
+    return result
@@ -0,0 +1,158 @@
+import hashlib
+import re
+from collections import OrderedDict
+from app.core.config import (
+    PRESCREEN_ACCEPT_HITS,
+    PRESCREEN_ENABLED,
+    PRESCREEN_MEMO_SIZE,
+    PRESCREEN_MIN_TOKENS,
+)
+from app.models.sessions import SessionEligibilityResult
+
+###########################################################################
+# Deterministic pre-screen ahead of the eligibility LLM call. Obvious notes
+# never reach Ollama:
+#   reject -> no lexicon term at all and empty, too few distinct words,
+#             mostly non-letters, non-Latin script or keyboard-mash gibberish
+#   accept -> several distinct lexicon terms plus a clinical-context cue
+#             (patient, history, duration, ...), so "fever dreams" is not enough
+#   memo   -> the same patient details the LLM already judged reuse its verdict
+# Anything else is left to the LLM; a note with a lexicon term is never rejected.
+###########################################################################
+## Comma-separated symptom and clinical terms, matched case-insensitively
+SYMPTOM_LEXICON = tuple(term.strip() for term in """
+abdominal pain, abscess, ache, aches, allergy, anemia, anxiety, appetite,
+arrhythmia, arthritis, asthma, back pain, bleeding, blister, bloating,
+blood pressure, blurred vision, breathless, bruising, burning, cancer,
+chest pain, chills, confusion, congestion, constipation, convulsion, cough,
+coughing, cramp, cramps, diabetes, diarrhea, diarrhoea, dizziness, dizzy,
+dysuria, dyspnea, edema, fainting, fatigue, fever, fracture, headache,
+hearing loss, heart rate, heartburn, hematuria, hives, hypertension,
+infection, inflammation, injury, insomnia, itching, jaundice, joint pain,
+lesion, lethargy, lump, malaise, migraine, nausea, numbness, pain, painful,
+palpitations, paralysis, rash, runny nose, seizure, shortness of breath,
+sneezing, sore, sore throat, sputum, stiffness, swelling, swollen, syncope,
+tachycardia, tender, tenderness, tingling, tremor, ulcer, urination,
+vertigo, vomiting, weakness, weight loss, wheezing, wound
+""".split(","))
+
+## Common chart shorthand; matched like the lexicon, optionally followed by digits (DM2)
+CLINICAL_ABBREVIATIONS = tuple(term.strip() for term in """
+abd, afib, bp, cad, chf, ckd, copd, cp, cva, dm, doe, dvt, gerd, hr, htn,
+loc, mi, n/v, pe, pnd, rr, sob, uti
+""".split(","))
+
+## Cues that the text is about a patient rather than merely mentioning a symptom
+_CONTEXT = re.compile(
+    r"\b(?:pt|patient|c/o|complain(?:s|ing|ed)?|report(?:s|ed|ing)?|present(?:s|ed|ing)"
+    r"|denie[sd]|hx|history|onset|since|x\s*\d+\s*[dhw]"
+    r"|\d+\s*(?:hours?|hrs?|days?|weeks?|wks?|months?|years?|yrs?))\b",
+    re.IGNORECASE,
+)
+
+## One alternation, longest terms first so "chest pain" wins over "pain"
+_LEXICON = re.compile(
+    r"\b(?:"
+    + "|".join(
+        re.escape(term).replace(r"\ ", r"\s+")
+        for term in sorted(
+            set(SYMPTOM_LEXICON + CLINICAL_ABBREVIATIONS), key=len, reverse=True
+        )
+    )
+    + r")\d*\b",
+    re.IGNORECASE,
+)
+_WORDS = re.compile(r"[^\W\d_]{2,}")
+_VOWELS = re.compile(r"[aeiouy]", re.IGNORECASE)
+
+MIN_LETTER_RATIO = 0.5  # letters among non-space characters
+MIN_LATIN_RATIO = 0.8  # prompts and lexicon are English
+MIN_VOWEL_WORD_RATIO = 0.6  # "asdfg qwrtz" style notes fall below this
+
+_memo: OrderedDict[str, SessionEligibilityResult] = OrderedDict()
+_stats = {
+    "screened": 0,
+    "rejected": 0,
+    "accepted": 0,
+    "memo_hits": 0,
+    "deferred": 0,
+    "llm_calls_avoided": 0,
+}
+
+
+def prescreen_stats() -> dict:
+    return dict(_stats)
+
+
+def record_avoided_calls(count: int) -> None:
+    _stats["llm_calls_avoided"] += count
+
+
+## Age and gender are part of the eligibility prompt, so they are part of the key
+def _key(age: int, gender: str, note: str) -> str:
+    normalized = f"{age}|{gender}|{' '.join(note.lower().split())}"
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+
+def _reason_to_reject(note: str) -> str | None:
+    characters = [c for c in note if not c.isspace()]
+    if not characters:
+        return "The patient note is empty."
+
+    letters = [c for c in characters if c.isalpha()]
+    if len(letters) / len(characters) < MIN_LETTER_RATIO:
+        return "The patient note is mostly numbers or symbols, not a description."
+    if sum(c.isascii() for c in letters) / len(letters) < MIN_LATIN_RATIO:
+        return "The patient note must be written in English."
+
+    words = {word.lower() for word in _WORDS.findall(note)}
+    if len(words) < PRESCREEN_MIN_TOKENS:
+        return "The patient note is too short to describe symptoms or medical context."
+    vowel_words = sum(bool(_VOWELS.search(word)) for word in words)
+    if vowel_words / len(words) < MIN_VOWEL_WORD_RATIO:
+        return "The patient note does not read as natural language."
+    return None
+
+
+def _screen(age: int, gender: str, note: str) -> SessionEligibilityResult | None:
+    hits = {" ".join(match.lower().split()) for match in _LEXICON.findall(note)}
+    if not hits and (reasoning := _reason_to_reject(note)) is not None:
+        _stats["rejected"] += 1
+        return SessionEligibilityResult(eligible=False, reasoning=reasoning)
+
+    if len(hits) >= PRESCREEN_ACCEPT_HITS and _CONTEXT.search(note):
+        _stats["accepted"] += 1
+        return SessionEligibilityResult(
+            eligible=True,
+            reasoning=f"The note describes clinical findings: {', '.join(sorted(hits))}.",
+        )
+
+    key = _key(age, gender, note)
+    if (verdict := _memo.get(key)) is not None:
+        _memo.move_to_end(key)
+        _stats["memo_hits"] += 1
+        return verdict
+
+    _stats["deferred"] += 1
+    return None
+
+
+### Verdict without an LLM call, or None when the LLM has to decide
+def prescreen_note(age: int, gender: str, note: str) -> SessionEligibilityResult | None:
+    if not PRESCREEN_ENABLED:
+        return None
+    _stats["screened"] += 1
+    return _screen(age, gender, note)
+
+
+### Keeps the LLM's verdict so a resubmitted note skips the call
+def remember_verdict(
+    age: int, gender: str, note: str, verdict: SessionEligibilityResult
+) -> None:
+    if not PRESCREEN_ENABLED or PRESCREEN_MEMO_SIZE <= 0:
+        return
+    key = _key(age, gender, note)
+    _memo[key] = verdict
+    _memo.move_to_end(key)
+    while len(_memo) > PRESCREEN_MEMO_SIZE:
+        _memo.popitem(last=False)
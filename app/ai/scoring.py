@@ -0,0 +1,71 @@
+import numpy as np
+from app.models.graph import ClinicalMetric, MiniCDSSState, RelevanceStatus
+
+###########################################################################
+# Deterministic confidence metrics. Diagnoses x evidence link matrices are
+# built from supporting/conflicting ids and weighted by clinical type:
+#   support_score  = weighted sum of linked supporting evidence
+#   conflict_score = weighted sum of linked conflicting evidence
+#   confidence     = (support + a) / (support + conflict + a + b)
+# The prior keeps sparsely evidenced diagnoses low and stays inside [0, 1].
+# Redundant evidence and ids that match no evidence carry no weight.
+###########################################################################
+CLINICAL_TYPE_WEIGHTS = {"Symptom": 1.0, "Sign": 1.5, "Lab": 2.0, "History": 0.75}
+SUPPORT_PRIOR = 0.5  # a
+CONFLICT_PRIOR = 1.5  # b -> a diagnosis without evidence scores 0.25
+
+_stats = {"runs": 0, "diagnoses": 0}
+
+
+def scoring_stats() -> dict:
+    return dict(_stats)
+
+
+def _links(rows: list[list[str]], columns: dict[str, int]) -> np.ndarray:
+    matrix = np.zeros((len(rows), len(columns)))
+    pairs = [
+        (row, columns[evidence_id])
+        for row, ids in enumerate(rows)
+        for evidence_id in set(ids)
+        if evidence_id in columns
+    ]
+    if pairs:
+        matrix[tuple(np.array(pairs).T)] = 1.0
+    return matrix
+
+
+### Rescores every non-redundant diagnosis in the state, keyed by diagnosis id
+def score_diagnoses(state: MiniCDSSState) -> dict[str, ClinicalMetric]:
+    diagnoses = [d for d in state.diagnoses if d.relevance != RelevanceStatus.REDUNDANT]
+    if not diagnoses:
+        return {}
+
+    evidence = {
+        e.id: e
+        for e in state.positive_evidence + state.negative_evidence
+        if e.relevance != RelevanceStatus.REDUNDANT
+    }
+    columns = {evidence_id: index for index, evidence_id in enumerate(evidence)}
+    weights = np.array(
+        [CLINICAL_TYPE_WEIGHTS[e.clinical_type] for e in evidence.values()],
+        dtype=float,
+    )
+
+    support = _links([d.supporting_evidence_ids for d in diagnoses], columns) @ weights
+    conflict = (
+        _links([d.conflicting_evidence_ids for d in diagnoses], columns) @ weights
+    )
+    confidence = (support + SUPPORT_PRIOR) / (
+        support + conflict + SUPPORT_PRIOR + CONFLICT_PRIOR
+    )
+
+    _stats["runs"] += 1
+    _stats["diagnoses"] += len(diagnoses)
+    return {
+        d.id: ClinicalMetric(
+            confidence=round(float(c), 3),
+            support_score=round(float(s), 3),
+            conflict_score=round(float(x), 3),
+        )
+        for d, c, s, x in zip(diagnoses, confidence, support, conflict)
+    }
@@ -1,9 +1,30 @@
-from app.models.sessions import SessionEligibilityResult, SessionInitializationResult
+import asyncio
+from app.core.config import SESSION_INTAKE_MODE
+from app.models.sessions import (
+    SessionEligibilityResult,
+    SessionInitializationResult,
+    SessionIntakeResult,
+)
 from app.ai.prompts import (
     SESSION_CREATION_VALIDATION_PROMPT,
     SESSION_DIAGNOSIS_INITIALIZATION_PROMPT,
+    SESSION_INTAKE_PROMPT,
 )
 from app.llm.builder import LLMProviderFactory
+from app.llm.schemas import register_schemas
+from app.llm.prefix import register_system_prompt
+from app.ai.prescreen import prescreen_note, record_avoided_calls, remember_verdict
+
+SESSION_INTAKE_MODES = ("concurrent", "sequential", "combined")
+
+register_schemas(
+    SessionEligibilityResult, SessionInitializationResult, SessionIntakeResult
+)
+register_system_prompt("session_validation", SESSION_CREATION_VALIDATION_PROMPT)
+register_system_prompt(
+    "session_initialization", SESSION_DIAGNOSIS_INITIALIZATION_PROMPT
+)
+register_system_prompt("session_intake", SESSION_INTAKE_PROMPT)
 
 
 def format_session_creation_context(age: int, gender: str, note: str) -> str:
@@ -17,37 +38,111 @@ async def validate_content_before_session_creation(
     age: int, gender: str, note: str
 ) -> SessionEligibilityResult:
 
-    formatted_payload = format_session_creation_context(age, gender, note)
-
-    # Prepare the input for the prompt
-    prompt_load = {
-        "PATIENT_DETAILS": formatted_payload,
-    }
+    # The patient details are the whole per-call payload; instructions stay static
+    prompt = format_session_creation_context(age, gender, note)
 
-    # Format the prompt using the template
-    prompt = SESSION_CREATION_VALIDATION_PROMPT.format(**prompt_load)
-
-    # Invoke the LLM with the formatted prompt
+    # Invoke the LLM with the static instructions as the system prompt
     llm = LLMProviderFactory.ollama()
 
-    return await llm.invoke(prompt, SessionEligibilityResult)
+    return await llm.invoke(
+        prompt,
+        SessionEligibilityResult,
+        system_prompt=SESSION_CREATION_VALIDATION_PROMPT,
+    )
 
 
 async def initialize_session_differential_diagnosis(
     age: int, gender: str, note: str
 ) -> SessionInitializationResult:
 
-    formatted_payload = format_session_creation_context(age, gender, note)
+    # The patient details are the whole per-call payload; instructions stay static
+    prompt = format_session_creation_context(age, gender, note)
+
+    # Invoke the LLM with the static instructions as the system prompt
+    llm = LLMProviderFactory.ollama()
+
+    return await llm.invoke(
+        prompt,
+        SessionInitializationResult,
+        system_prompt=SESSION_DIAGNOSIS_INITIALIZATION_PROMPT,
+    )
+
 
-    # Prepare the input for the prompt
-    prompt_load = {
-        "PATIENT_DETAILS": formatted_payload,
-    }
+async def validate_and_initialize_session(
+    age: int, gender: str, note: str
+) -> SessionIntakeResult:
 
-    # Format the prompt using the template
-    prompt = SESSION_DIAGNOSIS_INITIALIZATION_PROMPT.format(**prompt_load)
+    # One call answers both stages; ineligible notes come back with empty fields
+    prompt = format_session_creation_context(age, gender, note)
 
-    # Invoke the LLM with the formatted prompt
     llm = LLMProviderFactory.ollama()
 
-    return await llm.invoke(prompt, SessionInitializationResult)
+    return await llm.invoke(
+        prompt,
+        SessionIntakeResult,
+        system_prompt=SESSION_INTAKE_PROMPT,
+    )
+
+
+###########################################################################
+# Session intake: eligibility check plus differential initialization.
+#   concurrent -> both calls start together; initialization is cancelled as
+#                 soon as the patient comes back ineligible
+#   sequential -> initialization only runs after an eligible verdict
+#   combined   -> one call with the merged SessionIntakeResult schema
+# The rule-based pre-screen runs first: a rejected note makes no call at all,
+# an accepted one goes straight to initialization.
+# Initialization is None whenever the patient is ineligible.
+###########################################################################
+async def run_session_intake(
+    age: int, gender: str, note: str, mode: str = SESSION_INTAKE_MODE
+) -> tuple[SessionEligibilityResult, SessionInitializationResult | None]:
+    if mode not in SESSION_INTAKE_MODES:
+        raise ValueError(
+            f"SESSION_INTAKE_MODE must be one of {SESSION_INTAKE_MODES}, got {mode!r}"
+        )
+
+    if (screened := prescreen_note(age, gender, note)) is not None:
+        if not screened.eligible:
+            record_avoided_calls(2 if mode == "concurrent" else 1)
+            return screened, None
+        record_avoided_calls(0 if mode == "combined" else 1)
+        return screened, await initialize_session_differential_diagnosis(
+            age, gender, note
+        )
+
+    if mode == "combined":
+        result = await validate_and_initialize_session(age, gender, note)
+        decision = SessionEligibilityResult(
+            eligible=result.eligible, reasoning=result.reasoning
+        )
+        remember_verdict(age, gender, note, decision)
+        if not result.eligible:
+            return decision, None
+        return decision, SessionInitializationResult.model_validate(
+            result.model_dump(exclude={"eligible", "reasoning"})
+        )
+
+    if mode == "sequential":
+        decision = await validate_content_before_session_creation(age, gender, note)
+        remember_verdict(age, gender, note, decision)
+        if not decision.eligible:
+            return decision, None
+        return decision, await initialize_session_differential_diagnosis(
+            age, gender, note
+        )
+
+    initialization = asyncio.create_task(
+        initialize_session_differential_diagnosis(age, gender, note)
+    )
+    try:
+        decision = await validate_content_before_session_creation(age, gender, note)
+        remember_verdict(age, gender, note, decision)
+        if decision.eligible:
+            return decision, await initialization
+    finally:
+        ## Ineligible, failed or cancelled: the speculative call is dropped
+        if not initialization.done():
+            initialization.cancel()
+            await asyncio.gather(initialization, return_exceptions=True)
+    return decision, None
@@ -0,0 +1,76 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.warmup import warmup
+from app.db.client import get_client as get_mongo_client
+from app.redis.client import get_async_client
+from app.llm.scheduler import scheduler_stats
+from app.llm.cache import cache_stats
+from app.llm.router import router_stats
+from app.llm.breaker import breaker_stats
+from app.llm.repair import repair_stats
+from app.llm.prefix import prefix_cache_stats
+from app.ai.context import context_stats
+from app.ai.prescreen import prescreen_stats
+from app.ai.scoring import scoring_stats
+from app.workflow.debouncer import session_debouncer
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+READY_CHECK_TIMEOUT_SECONDS = 2
+
+
+async def _check(probe) -> str:
+    try:
+        async with asyncio.timeout(READY_CHECK_TIMEOUT_SECONDS):
+            await probe
+        return "ok"
+    except Exception as e:
+        return f"failed: {str(e) or type(e).__name__}"
+
+
+## Liveness: the event loop answers; never touches dependencies
+@router.get("/live")
+async def liveness_endpoint():
+    return {"status": "alive"}
+
+
+## Readiness: stores reachable and warm-up finished (provider pings are informational)
+@router.get("/ready")
+async def readiness_endpoint():
+    mongo, redis = await asyncio.gather(
+        _check(get_mongo_client().admin.command("ping")),
+        _check(get_async_client().ping()),
+    )
+    ready = warmup.done and mongo == "ok" and redis == "ok"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "mongo": mongo,
+            "redis": redis,
+            "warmup": warmup.stats(),
+        },
+    )
+
+
+@router.get("/llm")
+async def llm_health_endpoint():
+    return {
+        "breakers": breaker_stats(),
+        "queues": scheduler_stats(),
+        "cache": cache_stats(),
+        "routing": router_stats(),
+        "output_repair": repair_stats(),
+        "prefix_cache": prefix_cache_stats(),
+        "prescreen": prescreen_stats(),
+    }
+
+
+@router.get("/graph")
+async def graph_health_endpoint():
+    return {
+        "debouncer": session_debouncer.stats(),
+        "prompt_context": context_stats(),
+        "local_rescoring": scoring_stats(),
+    }
@@ -0,0 +1,48 @@
+from fastapi import APIRouter
+from app.models.graph import MiniCDSSState
+from app.models.jobs import GraphJobCreate
+from app.services.jobs import (
+    create_graph_job,
+    ensure_session_exists,
+    cancel_job,
+    cancel_session_jobs,
+    get_job,
+    get_job_result,
+)
+from app.workflow.debouncer import session_debouncer
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+## Returns immediately; the run happens on a graph worker
+@router.post("/graph/{ses_id}", status_code=202)
+async def create_graph_job_endpoint(ses_id: str, data: GraphJobCreate):
+    return await create_graph_job(ses_id, data)
+
+
+## Doctor edits: deltas are merged over a quiet window into one run per burst
+@router.post("/graph/{ses_id}/edits", status_code=202)
+async def submit_graph_edit_endpoint(ses_id: str, state: MiniCDSSState):
+    await ensure_session_exists(ses_id)
+    return await session_debouncer.submit(ses_id, state)
+
+
+@router.post("/graph/{ses_id}/cancel")
+async def cancel_session_jobs_endpoint(ses_id: str):
+    session_debouncer.discard(ses_id)
+    return await cancel_session_jobs(ses_id)
+
+
+@router.get("/{job_id}")
+async def get_job_endpoint(job_id: str):
+    return await get_job(job_id)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result_endpoint(job_id: str):
+    return await get_job_result(job_id)
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job_endpoint(job_id: str):
+    return await cancel_job(job_id)
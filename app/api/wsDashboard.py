@@ -1,8 +1,7 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.wsConnectionManger import ConnectionManager
+from app.services.wsConnectionManger import connection_manager as manager
 
 router = APIRouter(prefix="/ws-dashboard", tags=["Dashboard-WS"])
-manager = ConnectionManager()
 
 
 @router.websocket("/{session_id}")
@@ -11,6 +11,13 @@ def require_env(name: str) -> str:
     return value
 
 
+def optional_env(name: str, default: str) -> str:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value
+
+
 ### LOAD THE NECESSARY ENV VARS
 MONGO_URI = require_env("MONGO_URI")
 REDIS_URI = require_env("REDIS_URI")
@@ -25,6 +32,68 @@ GOOGLE_MODEL = require_env("GOOGLE_MODEL")
 GROQ_MODEL_OSS_20B = require_env("GROQ_MODEL_OSS_20B")
 GROQ_MODEL_OSS_120B = require_env("GROQ_MODEL_OSS_120B")
 
+### LLM CLIENT POOL LIMITS (shared by all provider clients)
+LLM_MAX_CONNECTIONS = int(optional_env("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(optional_env("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(optional_env("LLM_KEEPALIVE_EXPIRY", "60"))
+
+### LLM SCHEDULER LIMITS (per model; RPM/TPM of 0 disables that bucket)
+GROQ_MAX_CONCURRENCY = int(optional_env("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_RPM = int(optional_env("GROQ_RPM", "30"))
+GROQ_TPM = int(optional_env("GROQ_TPM", "8000"))
+GOOGLE_MAX_CONCURRENCY = int(optional_env("GOOGLE_MAX_CONCURRENCY", "8"))
+GOOGLE_RPM = int(optional_env("GOOGLE_RPM", "15"))
+GOOGLE_TPM = int(optional_env("GOOGLE_TPM", "250000"))
+OLLAMA_MAX_CONCURRENCY = int(optional_env("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_KEEP_ALIVE = optional_env("OLLAMA_KEEP_ALIVE", "30m")  # model stays loaded
+LLM_RATE_LIMIT_RETRIES = int(optional_env("LLM_RATE_LIMIT_RETRIES", "3"))
+LLM_COMPLETION_TOKENS = int(optional_env("LLM_COMPLETION_TOKENS", "1024"))  # reserved in TPM
+
+### LLM CIRCUIT BREAKER (per provider/model)
+LLM_BREAKER_FAILURE_THRESHOLD = int(optional_env("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(optional_env("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+### LLM RESPONSE CACHE (opt-in, stored in Redis)
+LLM_CACHE_ENABLED = optional_env("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(optional_env("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(optional_env("LLM_CACHE_MAX_ENTRIES", "1000"))
+
+### STARTUP WARM-UP ("off" | "background" | "ping"; ping blocks startup up to the timeout)
+WARMUP_MODE = optional_env("WARMUP_MODE", "background")
+WARMUP_TIMEOUT_SECONDS = float(optional_env("WARMUP_TIMEOUT_SECONDS", "10"))
+
+### SESSION INTAKE ("concurrent" | "sequential" | "combined": one call validates and initializes)
+SESSION_INTAKE_MODE = optional_env("SESSION_INTAKE_MODE", "concurrent")
+PRESCREEN_ENABLED = optional_env("PRESCREEN_ENABLED", "true").lower() == "true"
+PRESCREEN_MIN_TOKENS = int(optional_env("PRESCREEN_MIN_TOKENS", "3"))  # distinct words
+PRESCREEN_ACCEPT_HITS = int(optional_env("PRESCREEN_ACCEPT_HITS", "2"))  # lexicon terms
+PRESCREEN_MEMO_SIZE = int(optional_env("PRESCREEN_MEMO_SIZE", "256"))
+
+### PROMPT CONTEXT (state inlined into agent prompts; tokens are ~4 chars each)
+CONTEXT_TOKEN_BUDGET = int(optional_env("CONTEXT_TOKEN_BUDGET", "4000"))
+## Per-agent overrides; unset falls back to CONTEXT_TOKEN_BUDGET
+DIFFERENTIAL_CONTEXT_TOKEN_BUDGET = int(optional_env("DIFFERENTIAL_CONTEXT_TOKEN_BUDGET", str(CONTEXT_TOKEN_BUDGET)))
+EVIDENCE_CONTEXT_TOKEN_BUDGET = int(optional_env("EVIDENCE_CONTEXT_TOKEN_BUDGET", str(CONTEXT_TOKEN_BUDGET)))
+DIAGNOSIS_CONTEXT_TOKEN_BUDGET = int(optional_env("DIAGNOSIS_CONTEXT_TOKEN_BUDGET", str(CONTEXT_TOKEN_BUDGET)))
+CONTEXT_REASONING_WINDOW = int(optional_env("CONTEXT_REASONING_WINDOW", "5"))
+CONTEXT_DELTA_WINDOW = int(optional_env("CONTEXT_DELTA_WINDOW", "3"))
+CONTEXT_PROMPT_FORMAT = optional_env("CONTEXT_PROMPT_FORMAT", "json")  # or "table"
+
+### GRAPH EXECUTION
+GRAPH_AUDITOR_MODE = optional_env("GRAPH_AUDITOR_MODE", "parallel")  # or "sequential"
+GRAPH_LOCAL_RESCORING = optional_env("GRAPH_LOCAL_RESCORING", "true").lower() == "true"  # rescore-only audits skip the LLM
+GRAPH_CHECKPOINT_KEEP_LAST = int(optional_env("GRAPH_CHECKPOINT_KEEP_LAST", "5"))
+GRAPH_CHECKPOINT_TTL_SECONDS = int(optional_env("GRAPH_CHECKPOINT_TTL_SECONDS", "604800"))
+
+### GRAPH JOB QUEUE (Redis Streams; 0 workers -> this process only enqueues)
+GRAPH_JOB_PARTITIONS = int(optional_env("GRAPH_JOB_PARTITIONS", "8"))
+GRAPH_JOB_TTL_SECONDS = int(optional_env("GRAPH_JOB_TTL_SECONDS", "86400"))
+GRAPH_WORKER_CONCURRENCY = int(optional_env("GRAPH_WORKER_CONCURRENCY", "4"))
+GRAPH_WORKER_LEASE_SECONDS = float(optional_env("GRAPH_WORKER_LEASE_SECONDS", "30"))
+GRAPH_WORKER_POLL_SECONDS = float(optional_env("GRAPH_WORKER_POLL_SECONDS", "1"))
+GRAPH_DEBOUNCE_SECONDS = float(optional_env("GRAPH_DEBOUNCE_SECONDS", "2"))
+GRAPH_RUN_TIMEOUT_SECONDS = float(optional_env("GRAPH_RUN_TIMEOUT_SECONDS", "180"))
+
 ### STATIC COLLECTION NAMES
 DOCTOR_COLLECTION = "doctors"
 PATIENT_COLLECTION = "patients"
@@ -1,5 +1,14 @@
 from app.db.health import check_mongo_connect, ensure_databases, ensure_collections
 from app.redis.health import check_redis_collection
+from app.db.client import close_connection as close_mongo_connection
+from app.redis.client import (
+    close_connection as close_redis_connection,
+    close_async_connection as close_async_redis_connection,
+)
+from app.llm.builder import close_providers
+from app.workflow.workers import graph_workers
+from app.services.wsConnectionManger import connection_manager
+from app.core.warmup import warmup
 
 
 async def on_start_checkup_ops():
@@ -8,3 +17,19 @@ async def on_start_checkup_ops():
     await ensure_collections()
 
     await check_redis_collection()
+
+    await connection_manager.start_relay()
+    await graph_workers.start()
+
+    ## Replaces the old full graph run at boot; see app/core/warmup.py for the modes
+    await warmup.start()
+
+
+async def on_shutdown_cleanup_ops():
+    await warmup.stop()
+    await graph_workers.stop()
+    await connection_manager.stop_relay()
+    await close_providers()
+    await close_mongo_connection()
+    close_redis_connection()
+    await close_async_redis_connection()
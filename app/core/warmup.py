@@ -0,0 +1,98 @@
+import asyncio
+import time
+from app.core.config import WARMUP_MODE, WARMUP_TIMEOUT_SECONDS
+from app.llm.builder import LLMProviderFactory, warm_providers
+from app.llm.schemas import register_schemas
+from app.models.graph import (
+    DifferentialDiagnosisAgentOutput,
+    EvidenceAuditerOutput,
+    DiagnosisAuditerOutput,
+)
+from app.models.sessions import (
+    SessionEligibilityResult,
+    SessionInitializationResult,
+    SessionIntakeResult,
+)
+from app.ai.differential import DIFFERENTIAL_ROUTING_POLICY
+from app.ai.evidence import EVIDENCE_AUDITER_ROUTING_POLICY
+from app.ai.diagnosis import DIAGNOSIS_AUDITER_ROUTING_POLICY
+
+WARMUP_MODES = ("off", "background", "ping")
+
+
+###########################################################################
+# Startup warm-up. Local work (schemas, provider clients) always runs and
+# takes milliseconds; provider round trips depend on the mode:
+#   off        -> none
+#   background -> pinged after startup; the app is ready once they finish
+#   ping       -> pinged before startup completes (bounded by the timeout)
+# A provider that fails its ping is reported, never fatal.
+###########################################################################
+class Warmup:
+    def __init__(
+        self, mode: str = WARMUP_MODE, timeout_seconds: float = WARMUP_TIMEOUT_SECONDS
+    ):
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"WARMUP_MODE must be one of {WARMUP_MODES}, got {mode!r}")
+        self.mode = mode
+        self.timeout_seconds = timeout_seconds
+        self.task: asyncio.Task | None = None
+        self.done = False
+        self.providers: dict[str, str] = {}
+        self.started_at: float | None = None
+        self.duration: float | None = None
+
+    def prebuild(self):
+        register_schemas(
+            DifferentialDiagnosisAgentOutput,
+            EvidenceAuditerOutput,
+            DiagnosisAuditerOutput,
+            SessionEligibilityResult,
+            SessionInitializationResult,
+            SessionIntakeResult,
+        )
+        for policy in (
+            DIFFERENTIAL_ROUTING_POLICY,
+            EVIDENCE_AUDITER_ROUTING_POLICY,
+            DIAGNOSIS_AUDITER_ROUTING_POLICY,
+        ):
+            LLMProviderFactory.routed(policy)
+        LLMProviderFactory.ollama()  ## Session creation agents
+
+    async def start(self):
+        self.started_at = time.perf_counter()
+        self.prebuild()
+        if self.mode == "ping":
+            await self._ping()
+        elif self.mode == "background":
+            self.task = asyncio.create_task(self._ping())
+        else:
+            self._finish()
+
+    async def _ping(self):
+        try:
+            self.providers = await warm_providers(self.timeout_seconds)
+        finally:
+            self._finish()
+
+    def _finish(self):
+        self.done = True
+        self.duration = round(time.perf_counter() - self.started_at, 3)
+        print(f"Warm-up ({self.mode}) finished in {self.duration}s: {self.providers}")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "done": self.done,
+            "duration_seconds": self.duration,
+            "providers": dict(self.providers),
+        }
+
+
+warmup = Warmup()
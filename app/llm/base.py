@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Protocol, Type, TypeVar
+from pydantic import BaseModel
+from app.llm.schemas import get_schema_json
+
+T = TypeVar("T", bound=BaseModel)
+
+## Called with a dotted path (e.g. "strategy.next_question", "diagnosis_evaluations[0]")
+## and the parsed value of that field as soon as it is complete in a streamed response.
+PartialCallback = Callable[[str, Any], Awaitable[None]]
+
+
+### HELPER FUNCTION FOR VALIDATION ###
+def parse_structured_output(raw: object, output_model: Type[T]) -> T:
+    if not isinstance(raw, str):
+        raise TypeError(f"Expected JSON string, got {type(raw)}")
+
+    return output_model.model_validate_json(raw)
+
+
+### Stable identity of a structured request: (model, system + user prompt, output schema)
+def request_key(
+    model: str, prompt: str, output_model: Type[BaseModel], system_prompt: str = ""
+) -> str:
+    schema = get_schema_json(output_model)
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, prompt, schema):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+### Static instructions go first as the system message so providers can reuse the
+### cached prefix; the per-turn payload follows as the user message
+def chat_messages(prompt: str, system_prompt: str = "") -> list[dict[str, str]]:
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    return messages + [{"role": "user", "content": prompt}]
+
+
+### Pythonic Protocol for a common invoke method for all llms ###
+class StructuredLLM(Protocol):
+    provider: str
+    model: str
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T: ...
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T: ...
+
+    async def aclose(self) -> None: ...
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Literal, Type
+from pydantic import ValidationError
+from app.core.config import LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS
+from app.llm.base import T, PartialCallback, StructuredLLM
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit for {name} is open; retry in {retry_in:.1f}s")
+
+
+### closed -> (N consecutive failures) -> open -> (cool-down) -> half_open -> one probe call
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state: BreakerState = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        if self.state == "open":
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.cooldown_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.cooldown_seconds - elapsed)
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0.0)
+            self.probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if (
+            self.state == "half_open"
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"Circuit for {self.name} opened")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        self.probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "retry_in_seconds": (
+                round(
+                    max(self.cooldown_seconds - (time.monotonic() - self.opened_at), 0),
+                    3,
+                )
+                if self.state == "open"
+                else 0.0
+            ),
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_stats() -> dict[str, dict]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+### StructuredLLM wrapper that fails fast while its provider's circuit is open
+class BreakerLLM:
+    def __init__(self, llm: StructuredLLM, breaker: CircuitBreaker):
+        self.llm = llm
+        self.breaker = breaker
+        self.provider = llm.provider
+        self.model = llm.model
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        return await self._guarded(self.llm.invoke, prompt, output_model, system_prompt)
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        return await self._guarded(
+            self.llm.invoke_streaming, prompt, output_model, on_partial, system_prompt
+        )
+
+    async def _guarded(self, call, *args) -> T:
+        self.breaker.before_call()
+        try:
+            result = await call(*args)
+        except ValidationError:
+            ## The provider answered; malformed output is not an outage
+            self.breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
@@ -1,8 +1,11 @@
-from typing import Protocol, Type, TypeVar, Literal
-from pydantic import BaseModel
-from ollama import chat
+import asyncio
+from typing import AsyncIterator, Type, Literal
+import httpx
+from ollama import AsyncClient
 from langchain_google_genai import ChatGoogleGenerativeAI
-from groq import Groq
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from groq.types import CompletionUsage
+from langchain_core.messages.ai import UsageMetadata, add_usage
 from app.core.config import (
     GOOGLE_API_KEY,
     GROQ_API_KEY,
@@ -10,109 +13,457 @@ from app.core.config import (
     GOOGLE_MODEL,
     GROQ_MODEL_OSS_20B,
     GROQ_MODEL_OSS_120B,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY,
+    GROQ_MAX_CONCURRENCY,
+    GROQ_RPM,
+    GROQ_TPM,
+    GOOGLE_MAX_CONCURRENCY,
+    GOOGLE_RPM,
+    GOOGLE_TPM,
+    OLLAMA_MAX_CONCURRENCY,
+    LLM_CACHE_ENABLED,
+    OLLAMA_KEEP_ALIVE,
 )
-
-T = TypeVar("T", bound=BaseModel)
+from app.llm.base import (
+    T,
+    PartialCallback,
+    StructuredLLM,
+    chat_messages,
+    request_key,
+)
+from app.llm.prefix import record_prompt_usage
+from app.llm.scheduler import ProviderLimits, ScheduledLLM, get_queue
+from app.llm.cache import CachedLLM
+from app.llm.breaker import BreakerLLM, get_breaker
+from app.llm.schemas import get_schema, get_schema_json
+from app.llm.streaming import parse_stream
+from app.llm.repair import parse_with_repair
+from app.llm.router import ProviderName, RoutingPolicy, RoutedLLM
 
 
-### HELPER FUNCTION FOR VALIDATION ###
-def parse_structured_output(raw: object, output_model: Type[T]) -> T:
-    if not isinstance(raw, str):
-        raise TypeError(f"Expected JSON string, got {type(raw)}")
+### Connection pool limits shared by every provider's HTTP client
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
 
-    return output_model.model_validate_json(raw)
 
+### Ollama Implementation
+class OllamaStructuredLLM:
+    def __init__(self, model: str):
+        self.provider = "ollama"
+        self.model = model
+        self.client = AsyncClient(limits=pool_limits())
 
-### Pythonic Protocol for a common invoke method for all llms ###
-class StructuredLLM(Protocol):
     async def invoke(
         self,
         prompt: str,
         output_model: Type[T],
-    ) -> T: ...
+        system_prompt: str = "",
+    ) -> T:
+        raw = await self._complete(prompt, output_model, system_prompt)
 
+        return await parse_with_repair(
+            raw,
+            output_model,
+            lambda fix: self._complete(fix, output_model),
+            lambda: self._complete(prompt, output_model, system_prompt),
+        )
 
-### Ollama Implementation
-class OllamaStructuredLLM:
-    def __init__(self, model: str):
-        self.model = model
+    ## Ollama reuses its KV cache for a repeated prefix but does not report it
+    async def _complete(
+        self, prompt: str, output_model: Type[T], system_prompt: str = ""
+    ) -> str:
+        response = await self.client.chat(
+            model=self.model,
+            messages=chat_messages(prompt, system_prompt),
+            format=get_schema(output_model),
+            keep_alive=OLLAMA_KEEP_ALIVE,
+        )
+        return response.message.content
 
-    async def invoke(
+    async def invoke_streaming(
         self,
         prompt: str,
         output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
     ) -> T:
-        response = chat(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            format=output_model.model_json_schema(),
+        return await parse_stream(
+            self._stream(prompt, output_model, system_prompt),
+            output_model,
+            on_partial,
+            lambda fix: self._complete(fix, output_model),
+            lambda: self._complete(prompt, output_model, system_prompt),
         )
 
-        return parse_structured_output(response.message.content, output_model)
+    async def _stream(
+        self, prompt: str, output_model: Type[T], system_prompt: str = ""
+    ) -> AsyncIterator[str]:
+        async for chunk in await self.client.chat(
+            model=self.model,
+            messages=chat_messages(prompt, system_prompt),
+            format=get_schema(output_model),
+            stream=True,
+            keep_alive=OLLAMA_KEEP_ALIVE,
+        ):
+            yield chunk.message.content or ""
+
+    ## A generate without a prompt only loads the model (and keeps it resident)
+    async def warm(self) -> None:
+        await self.client.generate(model=self.model, keep_alive=OLLAMA_KEEP_ALIVE)
+
+    async def aclose(self) -> None:
+        await self.client.close()
 
 
 ### Google Implementation
 class GoogleStructuredLLM:
     def __init__(self, api_key: str, model: str):
+        self.provider = "google"
+        self.model = model
         self.llm = ChatGoogleGenerativeAI(
             model=model,
             api_key=api_key,
             temperature=0,
             response_mime_type="application/json",
+            client_args={"limits": pool_limits()},
+            max_retries=0,  ## 429s are retried by the scheduler (honours Retry-After)
         )
 
     async def invoke(
         self,
         prompt: str,
         output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        raw = await self._complete(prompt, system_prompt)
+
+        return await parse_with_repair(
+            raw,
+            output_model,
+            self._complete,
+            lambda: self._complete(prompt, system_prompt),
+        )
+
+    async def _complete(self, prompt: str, system_prompt: str = "") -> str:
+        response = await self.llm.ainvoke(chat_messages(prompt, system_prompt))
+        self._record_usage(system_prompt, response.usage_metadata)
+        return response.content
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
     ) -> T:
-        response = self.llm.invoke(prompt)
+        return await parse_stream(
+            self._stream(prompt, system_prompt),
+            output_model,
+            on_partial,
+            self._complete,
+            lambda: self._complete(prompt, system_prompt),
+        )
+
+    async def _stream(self, prompt: str, system_prompt: str = "") -> AsyncIterator[str]:
+        usage = None  ## Chunks carry usage deltas
+        async for chunk in self.llm.astream(chat_messages(prompt, system_prompt)):
+            if chunk.usage_metadata:
+                usage = add_usage(usage, chunk.usage_metadata)
+            if isinstance(chunk.content, str):
+                yield chunk.content
+        self._record_usage(system_prompt, usage)
+
+    def _record_usage(self, system_prompt: str, usage: UsageMetadata | None):
+        if usage:
+            record_prompt_usage(
+                system_prompt,
+                self.model,
+                usage["input_tokens"],
+                usage.get("input_token_details", {}).get("cache_read", 0),
+            )
 
-        return parse_structured_output(response.content, output_model)
+    ## Model metadata lookup: opens the pooled connection without billing tokens
+    async def warm(self) -> None:
+        await self.llm.client.aio.models.get(model=self.model)
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
 
 
 ### Groq Implementation
 class GroqStructuredLLM:
     def __init__(self, api_key: str, model: str) -> None:
-        self.client = Groq(api_key=api_key)
+        self.provider = "groq"
+        self.client = AsyncGroq(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(limits=pool_limits()),
+            max_retries=0,  ## 429s are retried by the scheduler (honours Retry-After)
+        )
         self.model = model
 
     async def invoke(
         self,
         prompt: str,
         output_model: Type[T],
+        system_prompt: str = "",
     ) -> T:
-        completion = self.client.chat.completions.create(
+        raw = await self._complete(prompt, output_model, system_prompt)
+
+        return await parse_with_repair(
+            raw,
+            output_model,
+            lambda fix: self._complete(fix, output_model),
+            lambda: self._complete(prompt, output_model, system_prompt),
+        )
+
+    async def _complete(
+        self, prompt: str, output_model: Type[T], system_prompt: str = ""
+    ) -> str:
+        completion = await self.client.chat.completions.create(
             model=self.model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=chat_messages(prompt, system_prompt),
             response_format={
                 "type": "json_schema",
                 "json_schema": {
                     "name": "structured_output_generation",
-                    "schema": output_model.model_json_schema(),
+                    "schema": get_schema(output_model),
                 },
             },
         )
+        self._record_usage(system_prompt, completion.usage)
+
+        return completion.choices[0].message.content
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        return await parse_stream(
+            self._stream(prompt, output_model, system_prompt),
+            output_model,
+            on_partial,
+            lambda fix: self._complete(fix, output_model),
+            lambda: self._complete(prompt, output_model, system_prompt),
+        )
+
+    async def _stream(
+        self, prompt: str, output_model: Type[T], system_prompt: str = ""
+    ) -> AsyncIterator[str]:
+        ## Groq does not stream json_schema responses; use JSON mode and pass the
+        ## schema as a system message instead (the final object is still validated).
+        ## It follows the agent's instructions so the cached prefix stays intact.
+        messages = chat_messages(prompt, system_prompt)
+        messages.insert(
+            -1,
+            {
+                "role": "system",
+                "content": "Respond only with a JSON object matching this JSON schema: "
+                + get_schema_json(output_model),
+            },
+        )
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.x_groq and chunk.x_groq.usage:
+                self._record_usage(system_prompt, chunk.x_groq.usage)
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    def _record_usage(self, system_prompt: str, usage: CompletionUsage | None):
+        if usage:
+            details = usage.prompt_tokens_details
+            record_prompt_usage(
+                system_prompt,
+                self.model,
+                usage.prompt_tokens,
+                (details.cached_tokens or 0) if details else 0,
+            )
+
+    ## Model metadata lookup: opens the pooled connection without billing tokens
+    async def warm(self) -> None:
+        await self.client.models.retrieve(self.model)
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+### Single-flight: concurrent identical requests share one in-flight call
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class CoalescingLLM:
+    def __init__(self, llm: StructuredLLM):
+        self.llm = llm
+        self.provider = llm.provider
+        self.model = llm.model
+        self._inflight: dict[str, _Flight] = {}
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        key = request_key(self.model, prompt, output_model, system_prompt)
+        flight = self._inflight.get(key)
+        leader = flight is None
+        if flight is None:
+            flight = _Flight(
+                asyncio.create_task(
+                    self.llm.invoke(prompt, output_model, system_prompt)
+                )
+            )
+            self._inflight[key] = flight
+
+        flight.waiters += 1
+        try:
+            ## Shield so one waiter going away does not cancel the call for the others;
+            ## errors raised by the shared call reach every waiter.
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.task.done() or flight.waiters == 0:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()  ## Every waiter left -> abort the underlying request
+
+        ## Followers get their own copy so no two callers share mutable state
+        return result if leader else result.model_copy(deep=True)
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        ## Partial fields are per-caller, so streamed requests are not coalesced
+        return await self.llm.invoke_streaming(
+            prompt, output_model, on_partial, system_prompt
+        )
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+
+
+### Scheduler limits per provider; every model of a provider gets its own queue
+OLLAMA_LIMITS = ProviderLimits(max_concurrency=OLLAMA_MAX_CONCURRENCY)
+GOOGLE_LIMITS = ProviderLimits(
+    max_concurrency=GOOGLE_MAX_CONCURRENCY,
+    requests_per_minute=GOOGLE_RPM,
+    tokens_per_minute=GOOGLE_TPM,
+)
+GROQ_LIMITS = ProviderLimits(
+    max_concurrency=GROQ_MAX_CONCURRENCY,
+    requests_per_minute=GROQ_RPM,
+    tokens_per_minute=GROQ_TPM,
+)
+
+
+### Process-wide provider registry; each client (and its connection pool) is built once
+_providers: dict[str, StructuredLLM] = {}
+_routers: dict[str, StructuredLLM] = {}
+_clients: dict[str, StructuredLLM] = {}  # unwrapped, for warm-up pings
 
-        content = completion.choices[0].message.content
-        return parse_structured_output(content, output_model)
+
+def _register(name: str, llm: StructuredLLM, limits: ProviderLimits) -> StructuredLLM:
+    _clients[name] = llm
+    provider: StructuredLLM = BreakerLLM(
+        ScheduledLLM(llm, get_queue(name, limits)), get_breaker(name)
+    )
+    if LLM_CACHE_ENABLED:
+        provider = CachedLLM(provider)
+    provider = CoalescingLLM(provider)
+    _providers[name] = provider
+    return provider
 
 
 class LLMProviderFactory:
     @staticmethod
     def ollama() -> StructuredLLM:
-        return OllamaStructuredLLM(model=OLLAMA_MODEL)
+        if "ollama" in _providers:
+            return _providers["ollama"]
+        return _register(
+            "ollama", OllamaStructuredLLM(model=OLLAMA_MODEL), OLLAMA_LIMITS
+        )
 
     @staticmethod
     def google() -> StructuredLLM:
-        return GoogleStructuredLLM(
-            model=GOOGLE_MODEL,
-            api_key=GOOGLE_API_KEY,
+        if "google" in _providers:
+            return _providers["google"]
+        return _register(
+            "google",
+            GoogleStructuredLLM(model=GOOGLE_MODEL, api_key=GOOGLE_API_KEY),
+            GOOGLE_LIMITS,
         )
 
     @staticmethod
     def groq(params: Literal["20B", "120B"] = "20B") -> StructuredLLM:
-        if params == "120B":
-            return GroqStructuredLLM(api_key=GROQ_API_KEY, model=GROQ_MODEL_OSS_120B)
+        key = f"groq-{params}"
+        if key in _providers:
+            return _providers[key]
+        model = GROQ_MODEL_OSS_120B if params == "120B" else GROQ_MODEL_OSS_20B
+        return _register(
+            key, GroqStructuredLLM(api_key=GROQ_API_KEY, model=model), GROQ_LIMITS
+        )
+
+    @staticmethod
+    def by_name(name: ProviderName) -> StructuredLLM:
+        if name == "ollama":
+            return LLMProviderFactory.ollama()
+        if name == "google":
+            return LLMProviderFactory.google()
+        return LLMProviderFactory.groq(params="120B" if name == "groq-120B" else "20B")
+
+    @staticmethod
+    def routed(policy: RoutingPolicy) -> StructuredLLM:
+        if policy.name not in _routers:
+            names = [policy.primary, *policy.fallbacks]
+            _routers[policy.name] = RoutedLLM(
+                policy, {name: LLMProviderFactory.by_name(name) for name in names}
+            )
+        return _routers[policy.name]
+
+
+### One cheap round trip per built provider, run concurrently; never raises
+async def warm_providers(timeout: float) -> dict[str, str]:
+    async def warm(name: str) -> str:
+        try:
+            async with asyncio.timeout(timeout):
+                await _clients[name].warm()
+            return "ok"
+        except Exception as e:
+            print(f"Warm-up of LLM provider {name} failed: {e!r}")
+            return f"failed: {str(e) or type(e).__name__}"
+
+    names = list(_clients)
+    return dict(zip(names, await asyncio.gather(*(warm(name) for name in names))))
+
 
-        return GroqStructuredLLM(api_key=GROQ_API_KEY, model=GROQ_MODEL_OSS_20B)
+async def close_providers():
+    for name, provider in list(_providers.items()):
+        try:
+            await provider.aclose()
+            print(f"Closing LLM provider: {name}")
+        except Exception as e:
+            print(f"Ran into error with closing LLM provider {name}: ", e)
+    _providers.clear()
+    _routers.clear()
+    _clients.clear()
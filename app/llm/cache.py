@@ -0,0 +1,124 @@
+import time
+from typing import Type
+from pydantic import ValidationError
+from app.core.config import LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+from app.llm.base import T, PartialCallback, StructuredLLM, request_key
+from app.llm.streaming import emit_fields
+from app.redis.client import get_async_client
+
+CACHE_PREFIX = "llm_cache"
+CACHE_INDEX_KEY = f"{CACHE_PREFIX}:index"  # zset of entry keys scored by write time
+CACHE_STATS_KEY = f"{CACHE_PREFIX}:stats"  # fleet-wide hit/miss counters
+
+_stats = {"hits": 0, "misses": 0, "errors": 0, "evictions": 0}
+
+
+def cache_stats() -> dict:
+    return dict(_stats)
+
+
+### StructuredLLM wrapper that serves repeated (model, prompt, schema) requests from Redis
+class CachedLLM:
+    def __init__(
+        self,
+        llm: StructuredLLM,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.llm = llm
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.provider = llm.provider
+        self.model = llm.model
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        key = self._key(prompt, output_model, system_prompt)
+
+        cached = await self._lookup(key, output_model)
+        if cached is not None:
+            return cached
+
+        result = await self.llm.invoke(prompt, output_model, system_prompt)
+        await self._write(key, result.model_dump_json())
+        return result
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        key = self._key(prompt, output_model, system_prompt)
+
+        cached = await self._lookup(key, output_model)
+        if cached is not None:
+            await emit_fields(cached.model_dump(mode="json"), on_partial)
+            return cached
+
+        result = await self.llm.invoke_streaming(
+            prompt, output_model, on_partial, system_prompt
+        )
+        await self._write(key, result.model_dump_json())
+        return result
+
+    def _key(self, prompt: str, output_model: Type[T], system_prompt: str) -> str:
+        return f"{CACHE_PREFIX}:{request_key(self.model, prompt, output_model, system_prompt)}"
+
+    async def _lookup(self, key: str, output_model: Type[T]) -> T | None:
+        cached = await self._read(key)
+        if cached is not None:
+            try:
+                result = output_model.model_validate_json(cached)
+                await self._count("hits")
+                return result
+            except ValidationError:
+                pass  ## Stale entry from an older schema -> treat as a miss
+
+        await self._count("misses")
+        return None
+
+    async def _read(self, key: str) -> str | None:
+        try:
+            return await get_async_client().get(key)
+        except Exception as e:
+            _stats["errors"] += 1
+            print("LLM cache read failed: ", e)
+            return None
+
+    async def _write(self, key: str, value: str):
+        try:
+            client = get_async_client()
+            now = time.time()
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=self.ttl_seconds)
+                pipe.zadd(CACHE_INDEX_KEY, {key: now})
+                pipe.zremrangebyscore(CACHE_INDEX_KEY, 0, now - self.ttl_seconds)
+                pipe.zcard(CACHE_INDEX_KEY)
+                *_, size = await pipe.execute()
+
+            ## Size cap: evict the oldest entries beyond max_entries
+            overflow = size - self.max_entries
+            if overflow > 0:
+                evicted = await client.zpopmin(CACHE_INDEX_KEY, overflow)
+                if evicted:
+                    await client.delete(*[entry for entry, _ in evicted])
+                    _stats["evictions"] += len(evicted)
+        except Exception as e:
+            _stats["errors"] += 1
+            print("LLM cache write failed: ", e)
+
+    async def _count(self, field: str):
+        _stats[field] += 1
+        try:
+            await get_async_client().hincrby(CACHE_STATS_KEY, field, 1)
+        except Exception:
+            _stats["errors"] += 1
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
@@ -0,0 +1,39 @@
+### Prefix-cache accounting per agent. Agents register their static system prompt;
+### providers that report cached prompt tokens record each call against it.
+_owners: dict[str, str] = {}
+_stats: dict[str, dict[str, dict[str, int]]] = {}
+
+
+def register_system_prompt(name: str, system_prompt: str) -> None:
+    _owners[system_prompt] = name
+
+
+def record_prompt_usage(
+    system_prompt: str, model: str, prompt_tokens: int, cached_tokens: int
+) -> None:
+    if not system_prompt:
+        return  ## Corrective / ad-hoc calls carry no reusable prefix
+    name = _owners.get(system_prompt, "unregistered")
+    counts = _stats.setdefault(name, {}).setdefault(
+        model, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+    )
+    counts["calls"] += 1
+    counts["prompt_tokens"] += prompt_tokens
+    counts["cached_tokens"] += cached_tokens
+
+
+def prefix_cache_stats() -> dict:
+    return {
+        name: {
+            model: {
+                **counts,
+                "hit_rate": (
+                    round(counts["cached_tokens"] / counts["prompt_tokens"], 3)
+                    if counts["prompt_tokens"]
+                    else 0.0
+                ),
+            }
+            for model, counts in models.items()
+        }
+        for name, models in _stats.items()
+    }
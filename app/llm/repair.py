@@ -0,0 +1,267 @@
+import json
+import re
+from typing import Any, Awaitable, Callable, Type
+from pydantic import BaseModel, ValidationError
+from app.llm.base import T, parse_structured_output
+from app.llm.schemas import get_schema
+
+## Sends a short corrective prompt to the same model and returns its raw text
+CorrectiveCall = Callable[[str], Awaitable[str]]
+## Re-sends the original request and returns its raw text
+RetryCall = Callable[[], Awaitable[str]]
+
+CORRECTIVE_PROMPT = """
+Your previous JSON response did not validate against the required schema.
+
+Previous response:
+{RAW_OUTPUT}
+
+Validation errors:
+{ERRORS}
+
+Return ONLY the corrected JSON object. Keep every valid field unchanged.
+"""
+
+_stats = {
+    "valid": 0,
+    "local_repair": 0,
+    "corrective_call": 0,
+    "full_retry": 0,
+    "failed": 0,
+}
+
+
+def repair_stats() -> dict:
+    return dict(_stats)
+
+
+### LOCAL (NO-LLM) FIXES ###
+def strip_code_fences(raw: str) -> str:
+    text = raw.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    return text[start:] if start != -1 else text
+
+
+def fix_structure(text: str) -> str:
+    """Drops trailing commas and closes arrays/objects cut off mid-stream."""
+    return close_structure(text)[0]
+
+
+def close_structure(text: str) -> tuple[str, bool]:
+    """fix_structure, also reporting whether a cut-off fragment had to be dropped."""
+    out: list[str] = []
+    stack: list[str] = []  # expected closers
+    in_string = escaped = False
+    key_start: int | None = None  # where an unfinished object key began
+    string_start = 0
+    previous = ""  # last non-whitespace character outside strings
+
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+            continue
+
+        if c in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            if stack:
+                stack.pop()
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c == '"':
+            in_string = True
+            string_start = len(out)
+            ## A string right after "{" or "," inside an object is a key
+            if stack and stack[-1] == "}" and previous in ("{", ","):
+                key_start = len(out)
+        elif c == ":":
+            key_start = None
+        out.append(c)
+        if not c.isspace():
+            previous = c
+
+        if not stack and c in "}]":
+            break  ## Ignore anything after the root value
+
+    ## Cut off inside (or right after) a key, or inside a string value: drop the
+    ## fragment rather than keep half a clinical sentence
+    lossy = key_start is not None or in_string
+    if key_start is not None:
+        del out[key_start:]
+    elif in_string:
+        del out[string_start:]
+    fixed = "".join(out).rstrip()
+    if fixed.endswith(":"):
+        fixed = re.sub(r',?\s*"(?:[^"\\]|\\.)*"\s*:$', "", fixed)
+        lossy = True
+    ## A number or literal at the cut may itself be incomplete (0.8 of 0.85)
+    elif stack and not in_string and fixed[-1:].isalnum():
+        lossy = True
+    fixed = fixed.rstrip().rstrip(",")
+    return fixed + "".join(reversed(stack)), lossy
+
+
+def _enum_values(output_model: Type[BaseModel]) -> dict[str, str]:
+    values: dict[str, str] = {}
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            for value in node.get("enum", []):
+                if isinstance(value, str):
+                    values[value.strip().lower()] = value
+            if isinstance(node.get("const"), str):
+                values[node["const"].strip().lower()] = node["const"]
+            for child in node.values():
+                walk(child)
+        elif isinstance(node, list):
+            for child in node:
+                walk(child)
+
+    walk(get_schema(output_model))
+    return values
+
+
+def fix_enum_case(data: Any, output_model: Type[T], error: ValidationError) -> bool:
+    """Rewrites literal/enum values that only differ in case or whitespace."""
+    allowed = _enum_values(output_model)
+    changed = False
+    for err in error.errors():
+        if err["type"] not in ("literal_error", "enum") or not isinstance(
+            err["input"], str
+        ):
+            continue
+        canonical = allowed.get(err["input"].strip().lower())
+        if canonical is None:
+            continue
+
+        *parents, field = err["loc"]
+        target = data
+        try:
+            for part in parents:
+                target = target[part]
+            if target[field] == err["input"]:
+                target[field] = canonical
+                changed = True
+        except (KeyError, IndexError, TypeError):
+            continue
+    return changed
+
+
+### Accepted only when nothing but closing brackets had to be added; a response
+### that lost part of a key, value or item goes to the corrective call instead
+def local_repair(raw: str, output_model: Type[T]) -> T | None:
+    text, lossy = close_structure(strip_code_fences(raw))
+    if lossy:
+        return None
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+    try:
+        return output_model.model_validate(data)
+    except ValidationError as e:
+        fix_enum_case(data, output_model, e)
+    try:
+        return output_model.model_validate(data)
+    except ValidationError:
+        return None
+
+
+def format_errors(error: Exception) -> str:
+    if not isinstance(error, ValidationError):
+        return str(error)
+    return "\n".join(
+        f"- {'.'.join(map(str, err['loc'])) or '<root>'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+### Local repair failed. The corrective call and the full retry are left to
+### ScheduledLLM, which runs them through the provider queue once the slot that
+### produced the bad output is released
+class RepairNeeded(Exception):
+    def __init__(
+        self,
+        error: ValidationError,
+        raw: str,
+        output_model: Type[BaseModel],
+        corrective: CorrectiveCall | None,
+        retry: RetryCall | None,
+    ):
+        super().__init__(str(error))
+        self.error = error
+        self.raw = raw
+        self.output_model = output_model
+        self.corrective = corrective
+        self.retry = retry
+
+
+### valid -> local fix -> short corrective call -> one full retry -> raise
+async def parse_with_repair(
+    raw: object,
+    output_model: Type[T],
+    corrective: CorrectiveCall | None = None,
+    retry: RetryCall | None = None,
+) -> T:
+    try:
+        result = parse_structured_output(raw, output_model)
+        _stats["valid"] += 1
+        return result
+    except ValidationError as e:
+        error = e
+
+    ## Non-string output already raised TypeError; only JSON text gets repaired
+    assert isinstance(raw, str)
+    repaired = local_repair(raw, output_model)
+    if repaired is not None:
+        _stats["local_repair"] += 1
+        return repaired
+
+    if corrective is not None or retry is not None:
+        raise RepairNeeded(error, raw, output_model, corrective, retry)
+    _stats["failed"] += 1
+    raise error
+
+
+### Runs the remaining repair steps; schedule(call, *args) queues one provider call
+async def finish_repair(
+    repair: RepairNeeded, schedule: Callable[..., Awaitable[str]]
+) -> Any:
+    output_model = repair.output_model
+    if repair.corrective is not None:
+        fix = CORRECTIVE_PROMPT.format(
+            RAW_OUTPUT=repair.raw, ERRORS=format_errors(repair.error)
+        )
+        try:
+            corrected = await schedule(repair.corrective, fix)
+            repaired = local_repair(corrected, output_model)
+            if repaired is not None:
+                _stats["corrective_call"] += 1
+                return repaired
+        except Exception as e:
+            print(f"Corrective call for {output_model.__name__} failed: {e}")
+
+    ## ValidationError is a ValueError, which the node RetryPolicy never retries
+    error = repair.error
+    if repair.retry is not None:
+        _stats["full_retry"] += 1
+        raw = await schedule(repair.retry)
+        try:
+            return parse_structured_output(raw, output_model)
+        except ValidationError as e:
+            error = e
+        if (repaired := local_repair(raw, output_model)) is not None:
+            return repaired
+
+    _stats["failed"] += 1
+    raise error
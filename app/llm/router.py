@@ -0,0 +1,235 @@
+import asyncio
+import time
+from collections import deque
+from typing import Literal, Type
+from pydantic import BaseModel, Field
+from app.llm.base import T, PartialCallback, StructuredLLM
+from app.llm.breaker import get_breaker
+from app.llm.scheduler import Dispatch, current_dispatch
+
+ProviderName = Literal["groq-120B", "groq-20B", "google", "ollama"]
+
+
+class RoutingPolicy(BaseModel):
+    name: str = Field(description="Agent this policy belongs to (used for stats)")
+    primary: ProviderName
+    fallbacks: list[ProviderName] = Field(
+        default_factory=list,
+        description="Tried in order when the primary fails or is hedged",
+    )
+    hedge: bool = True
+    hedge_percentile: float = Field(default=0.95, gt=0, lt=1)
+    cold_hedge_delay: float = Field(
+        default=20.0,
+        description="Hedge delay (seconds) used until enough latency samples exist",
+    )
+    min_samples: int = 20
+    max_error_rate: float = Field(
+        default=0.5,
+        description="Providers above this recent error rate (or with an open circuit) are tried last",
+    )
+
+
+### Rolling latency / error window per provider
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+
+    def record(self, seconds: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def stats(self) -> dict:
+        return {
+            "samples": len(self.outcomes),
+            **{
+                f"p{int(q * 100)}_seconds": (
+                    round(value, 3)
+                    if (value := self.percentile(q)) is not None
+                    else None
+                )
+                for q in (0.50, 0.95, 0.99)
+            },
+            "error_rate": round(self.error_rate(), 3),
+        }
+
+
+_trackers: dict[str, LatencyTracker] = {}
+_hedges: dict[str, int] = {}
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    if name not in _trackers:
+        _trackers[name] = LatencyTracker()
+    return _trackers[name]
+
+
+def router_stats() -> dict:
+    return {
+        "providers": {name: tracker.stats() for name, tracker in _trackers.items()},
+        "hedges_fired": dict(_hedges),
+    }
+
+
+### StructuredLLM that hedges/falls back across providers according to a RoutingPolicy
+class RoutedLLM:
+    def __init__(self, policy: RoutingPolicy, providers: dict[str, StructuredLLM]):
+        self.policy = policy
+        self.providers = providers
+        self.provider = "router"
+        self.model = policy.name
+
+    def _candidates(self) -> list[str]:
+        ordered = [self.policy.primary, *self.policy.fallbacks]
+        healthy = [
+            name
+            for name in ordered
+            if get_breaker(name).state != "open"
+            and (
+                len(get_tracker(name).outcomes) < self.policy.min_samples
+                or get_tracker(name).error_rate() <= self.policy.max_error_rate
+            )
+        ]
+        return healthy + [name for name in ordered if name not in healthy]
+
+    def _hedge_delay(self, name: str) -> float:
+        tracker = get_tracker(name)
+        if len(tracker.latencies) < self.policy.min_samples:
+            return self.policy.cold_hedge_delay
+        return tracker.percentile(self.policy.hedge_percentile) or 0.0
+
+    ## Records provider latency from the moment the request left the scheduler
+    ## queue; coalesced or cached answers were never dispatched and are not sampled
+    async def _measured(self, name: str, dispatch: Dispatch, call, *args) -> T:
+        token = current_dispatch.set(dispatch)
+        try:
+            result = await call(*args)
+        except asyncio.CancelledError:
+            raise  ## Lost the race; not a provider failure
+        except Exception:
+            elapsed = time.perf_counter() - (dispatch.sent_at or time.perf_counter())
+            get_tracker(name).record(elapsed, ok=False)
+            raise
+        finally:
+            current_dispatch.reset(token)
+        if dispatch.sent_at is not None:
+            get_tracker(name).record(time.perf_counter() - dispatch.sent_at, ok=True)
+        return result
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        candidates = self._candidates()
+        pending: dict[asyncio.Task, str] = {}
+        errors: list[Exception] = []
+
+        def launch(dispatch: Dispatch) -> asyncio.Task:
+            name = candidates[len(pending) + len(errors)]
+            task = asyncio.create_task(
+                self._measured(
+                    name,
+                    dispatch,
+                    self.providers[name].invoke,
+                    prompt,
+                    output_model,
+                    system_prompt,
+                )
+            )
+            pending[task] = name
+            return task
+
+        ## Only the primary is hedged, once, p95 after it reached the provider;
+        ## time spent in its local queue or rate limiter does not count
+        primary = Dispatch()
+        primary_task = launch(primary)
+        sent = asyncio.create_task(primary.sent.wait())
+        hedged = not (self.policy.hedge and len(candidates) > 1)
+        hedge_at: float | None = None
+        try:
+            while pending:
+                waiting: set[asyncio.Future] = set(pending)
+                timeout = None
+                if not hedged and primary_task in pending:
+                    if hedge_at is None and primary.sent_at is not None:
+                        hedge_at = primary.sent_at + self._hedge_delay(candidates[0])
+                    if hedge_at is None:
+                        waiting.add(sent)
+                    else:
+                        timeout = max(hedge_at - time.perf_counter(), 0)
+
+                done, _ = await asyncio.wait(
+                    waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                done.discard(sent)
+
+                if timeout is not None and not done:  ## Primary slower than its p95
+                    hedged = True
+                    _hedges[self.policy.name] = _hedges.get(self.policy.name, 0) + 1
+                    print(f"{self.policy.name}: hedging to {candidates[1]}")
+                    launch(Dispatch())
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    print(f"{self.policy.name}: {name} failed: {task.exception()}")
+                    errors.append(task.exception())
+
+                ## Fallback: nothing left running but candidates remain
+                if not pending and len(errors) < len(candidates):
+                    launch(Dispatch())
+
+            raise errors[-1]
+
+        finally:
+            sent.cancel()
+            for task in pending:
+                task.cancel()
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        ## Streams cannot be hedged (partials would interleave); fall back in order
+        errors: list[Exception] = []
+        for name in self._candidates():
+            try:
+                return await self._measured(
+                    name,
+                    Dispatch(),
+                    self.providers[name].invoke_streaming,
+                    prompt,
+                    output_model,
+                    on_partial,
+                    system_prompt,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{self.policy.name}: {name} failed: {e}")
+                errors.append(e)
+
+        raise errors[-1]
+
+    async def aclose(self) -> None:
+        pass  ## Underlying providers are owned and closed by the registry
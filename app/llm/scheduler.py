@@ -0,0 +1,248 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Type
+from pydantic import BaseModel
+from app.core.config import LLM_COMPLETION_TOKENS, LLM_RATE_LIMIT_RETRIES
+from app.llm.base import T, PartialCallback, StructuredLLM
+from app.llm.repair import RepairNeeded, finish_repair
+
+
+class ProviderLimits(BaseModel):
+    max_concurrency: int = 4
+    requests_per_minute: int = 0  # 0 -> unlimited
+    tokens_per_minute: int = 0  # 0 -> unlimited
+    max_rate_limit_retries: int = LLM_RATE_LIMIT_RETRIES
+    ## Providers count output tokens against TPM too; reserved up front per request
+    completion_tokens: int = LLM_COMPLETION_TOKENS
+
+
+### Rough prompt size estimate (~4 chars per token) used for the TPM bucket
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+### HELPERS FOR PROVIDER RATE-LIMIT ERRORS ###
+def is_rate_limited(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status == 429
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(float(headers.get("retry-after")), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+### Classic token bucket; waiters are served in FIFO order through the lock
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        ## Oversized requests wait for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+### One queue per provider/model: concurrency cap + RPM/TPM buckets + Retry-After pause
+class ProviderQueue:
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self.requests = (
+            TokenBucket(limits.requests_per_minute)
+            if limits.requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        )
+        self.blocked_until = 0.0
+
+        # Observability
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def pause_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @asynccontextmanager
+    async def slot(self, prompt_tokens: int):
+        enqueued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            while (delay := self.blocked_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(prompt_tokens + self.limits.completion_tokens)
+
+            waited = time.monotonic() - enqueued_at
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+        finally:
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.limits.max_concurrency,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited,
+            "avg_wait_seconds": (
+                round(self.total_wait / self.completed, 3) if self.completed else 0.0
+            ),
+            "max_wait_seconds": round(self.max_wait, 3),
+            "paused_for_seconds": round(
+                max(self.blocked_until - time.monotonic(), 0.0), 3
+            ),
+        }
+
+
+_queues: dict[str, ProviderQueue] = {}
+
+
+def get_queue(name: str, limits: ProviderLimits) -> ProviderQueue:
+    if name not in _queues:
+        _queues[name] = ProviderQueue(name, limits)
+    return _queues[name]
+
+
+def scheduler_stats() -> dict[str, dict]:
+    return {name: queue.stats() for name, queue in _queues.items()}
+
+
+### Lets a caller see when its request left the queue, so provider latency can be
+### told apart from local queueing and rate-limit waits
+class Dispatch:
+    def __init__(self):
+        self.sent = asyncio.Event()
+        self.sent_at: float | None = None  # last dispatch (429 retries re-queue)
+
+    def mark(self):
+        self.sent_at = time.perf_counter()
+        self.sent.set()
+
+
+current_dispatch: ContextVar[Dispatch | None] = ContextVar(
+    "current_dispatch", default=None
+)
+
+
+### StructuredLLM wrapper that routes every invoke through its provider queue
+class ScheduledLLM:
+    def __init__(self, llm: StructuredLLM, queue: ProviderQueue):
+        self.llm = llm
+        self.queue = queue
+        self.provider = llm.provider
+        self.model = llm.model
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        system_prompt: str = "",
+    ) -> T:
+        return await self._repaired(
+            estimate_tokens(system_prompt) + estimate_tokens(prompt),
+            self.llm.invoke,
+            prompt,
+            output_model,
+            system_prompt,
+        )
+
+    async def invoke_streaming(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        on_partial: PartialCallback,
+        system_prompt: str = "",
+    ) -> T:
+        return await self._repaired(
+            estimate_tokens(system_prompt) + estimate_tokens(prompt),
+            self.llm.invoke_streaming,
+            prompt,
+            output_model,
+            on_partial,
+            system_prompt,
+        )
+
+    ## Corrective calls and full retries queue like any other request, so they
+    ## count against the RPM/TPM buckets and respect a Retry-After pause
+    async def _repaired(self, prompt_tokens: int, call, *args) -> T:
+        try:
+            return await self._scheduled(prompt_tokens, call, *args)
+        except RepairNeeded as repair:
+
+            def schedule(repair_call, *repair_args):
+                tokens = (
+                    sum(map(estimate_tokens, repair_args))
+                    if repair_args
+                    else prompt_tokens
+                )
+                return self._scheduled(tokens, repair_call, *repair_args)
+
+            return await finish_repair(repair, schedule)
+
+    async def _scheduled(self, prompt_tokens: int, call, *args) -> T:
+        attempt = 0
+        while True:
+            async with self.queue.slot(prompt_tokens):
+                if (dispatch := current_dispatch.get()) is not None:
+                    dispatch.mark()
+                try:
+                    return await call(*args)
+                except Exception as e:
+                    if (
+                        not is_rate_limited(e)
+                        or attempt >= self.queue.limits.max_rate_limit_retries
+                    ):
+                        raise
+                    self.queue.rate_limited += 1
+                    delay = retry_after_seconds(e) or 2.0 * (attempt + 1)
+                    print(f"{self.queue.name} rate limited; pausing queue for {delay}s")
+                    self.queue.pause_for(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
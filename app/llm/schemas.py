@@ -0,0 +1,60 @@
+import json
+from typing import Type
+from pydantic import BaseModel
+
+### Structured-output schemas are built once per model and reused by every request
+_schemas: dict[Type[BaseModel], dict] = {}
+_schema_json: dict[Type[BaseModel], str] = {}
+
+
+def register_schemas(*models: Type[BaseModel]) -> None:
+    for model in models:
+        if model not in _schemas:
+            schema = model.model_json_schema()
+            _schemas[model] = schema
+            _schema_json[model] = json.dumps(
+                schema, sort_keys=True, separators=(",", ":")
+            )
+
+
+## Treat the returned dict as read-only; it is shared across requests
+def get_schema(model: Type[BaseModel]) -> dict:
+    if model not in _schemas:
+        register_schemas(model)
+    return _schemas[model]
+
+
+## Canonical minified JSON form (used for request keys)
+def get_schema_json(model: Type[BaseModel]) -> str:
+    if model not in _schema_json:
+        register_schemas(model)
+    return _schema_json[model]
+
+
+if __name__ == "__main__":
+    ## Micro-benchmark: python -m app.llm.schemas
+    import timeit
+    from app.models.graph import (
+        DifferentialDiagnosisAgentOutput,
+        EvidenceAuditerOutput,
+        DiagnosisAuditerOutput,
+    )
+    from app.models.sessions import (
+        SessionEligibilityResult,
+        SessionInitializationResult,
+    )
+
+    runs = 2000
+    for model in (
+        DifferentialDiagnosisAgentOutput,
+        EvidenceAuditerOutput,
+        DiagnosisAuditerOutput,
+        SessionEligibilityResult,
+        SessionInitializationResult,
+    ):
+        rebuilt = timeit.timeit(lambda: model.model_json_schema(), number=runs)
+        cached = timeit.timeit(lambda: get_schema(model), number=runs)
+        print(
+            f"{model.__name__:<36} rebuild {rebuilt / runs * 1e6:8.1f}us"
+            f"  cached {cached / runs * 1e6:6.2f}us"
+        )
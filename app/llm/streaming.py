@@ -0,0 +1,139 @@
+import json
+from typing import Any, AsyncIterator, Type
+from app.llm.base import T, PartialCallback
+from app.llm.repair import CorrectiveCall, RetryCall, parse_with_repair
+
+
+def format_path(path: list[str | int]) -> str:
+    formatted = ""
+    for part in path:
+        formatted += f"[{part}]" if isinstance(part, int) else f".{part}"
+    return formatted.lstrip(".")
+
+
+class _Frame:
+    def __init__(self, kind: str, start: int):
+        self.kind = kind  # "object" | "array"
+        self.start = start
+        self.key: str | None = None
+        self.index = 0
+        self.awaiting_key = kind == "object"
+
+    def current(self) -> str | int | None:
+        return self.key if self.kind == "object" else self.index
+
+
+### Incremental JSON scanner: feed raw chunks, get back (path, value) for completed fields
+class IncrementalJSONParser:
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.text = ""
+        self.pos = 0
+        self.stack: list[_Frame] = []
+        self.started = False
+        self.finished = False
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.scalar_start: int | None = None
+
+    def _path(self) -> list[str | int]:
+        return [frame.current() for frame in self.stack]
+
+    def _complete(self, start: int, end: int, completed: list[tuple[str, Any]]):
+        path = self._path()
+        if 1 <= len(path) <= self.max_depth:
+            completed.append((format_path(path), json.loads(self.text[start:end])))
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        completed: list[tuple[str, Any]] = []
+        self.text += chunk
+        text = self.text
+
+        while self.pos < len(text) and not self.finished:
+            i, c = self.pos, text[self.pos]
+            self.pos += 1
+
+            if not self.started:
+                ## Skip anything (code fences, chatter) before the root object
+                if c == "{":
+                    self.started = True
+                    self.stack.append(_Frame("object", i))
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    frame = self.stack[-1]
+                    if frame.kind == "object" and frame.awaiting_key:
+                        frame.key = json.loads(text[self.string_start : i + 1])
+                    else:
+                        self._complete(self.string_start, i + 1, completed)
+                continue
+
+            if self.scalar_start is not None and c in ",}] \t\r\n":
+                self._complete(self.scalar_start, i, completed)
+                self.scalar_start = None
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in "{[":
+                self.stack.append(_Frame("object" if c == "{" else "array", i))
+            elif c in "}]":
+                frame = self.stack.pop()
+                if not self.stack:
+                    self.finished = True
+                elif len(self._path()) <= self.max_depth:
+                    self._complete(frame.start, i + 1, completed)
+            elif c == ":":
+                self.stack[-1].awaiting_key = False
+            elif c == ",":
+                frame = self.stack[-1]
+                if frame.kind == "object":
+                    frame.awaiting_key = True
+                else:
+                    frame.index += 1
+            elif not c.isspace() and self.scalar_start is None:
+                self.scalar_start = i
+
+        return completed
+
+
+### Emits fields of an already complete object the same way a stream would
+async def emit_fields(
+    value: Any,
+    on_partial: PartialCallback,
+    max_depth: int = 2,
+    path: list[str | int] | None = None,
+):
+    path = path or []
+    if len(path) >= max_depth or not isinstance(value, (dict, list)):
+        return
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    for key, item in items:
+        await emit_fields(item, on_partial, max_depth, [*path, key])
+        await on_partial(format_path([*path, key]), item)
+
+
+### Consumes a text stream, reporting finished fields, then validates the whole object
+async def parse_stream(
+    chunks: AsyncIterator[str],
+    output_model: Type[T],
+    on_partial: PartialCallback,
+    corrective: CorrectiveCall | None = None,
+    retry: RetryCall | None = None,
+) -> T:
+    parser = IncrementalJSONParser()
+    async for chunk in chunks:
+        for path, value in parser.feed(chunk):
+            await on_partial(path, value)
+
+    raw = parser.text
+    if parser.started:
+        raw = raw[raw.index("{") : parser.pos]
+    return await parse_with_repair(raw, output_model, corrective, retry)
@@ -3,33 +3,27 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from fastapi.responses import JSONResponse
-from app.core.setup import on_start_checkup_ops
+from app.core.setup import on_start_checkup_ops, on_shutdown_cleanup_ops
 from app.api.doctors import router as doctor_router
 from app.api.sessions import router as session_router
 from app.api.wsDashboard import router as ws_router
+from app.api.health import router as health_router
+from app.api.jobs import router as jobs_router
 from app.core.config import ORIGINS
 from app.models.error import UserFacingError
 from pydantic import ValidationError
 from fastapi.exceptions import RequestValidationError
 
-from app.workflow.graph import compiled_graph
-from app.models.graph import MiniCDSSState
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
     await on_start_checkup_ops()
 
-    initial_state = MiniCDSSState(
-        initial_patient_notes="Patient complains about cold, cold seem to be there since last night. Fever is not exactly present but the onset can be felt seeing the patient's face. Greenish Phelgm, wet cough present in lungs, but white stuff coming out of nose."
-    )
-    result = await compiled_graph.ainvoke(initial_state)
-
     yield
 
     # shutdown
-    # await cleanup_ops()
+    await on_shutdown_cleanup_ops()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -110,6 +104,8 @@ async def generic_exception_handler(_, exc: Exception):
 app.include_router(doctor_router)
 app.include_router(session_router)
 app.include_router(ws_router)
+app.include_router(health_router)
+app.include_router(jobs_router)
 
 
 @app.get("/")
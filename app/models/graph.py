@@ -289,6 +289,30 @@ class DifferentialDiagnosisAgentOutput(BaseModel):
     )
 
 
+class PromptContext(BaseModel):
+    """Immutable, prompt-ready rendering of the clinical state shared by all agents in a run."""
+
+    model_config = ConfigDict(frozen=True)
+
+    fingerprints: dict[str, str] = Field(
+        default_factory=dict,
+        description="Content hash per source state field; a field is re-rendered only when its hash changes",
+    )
+    encoding: Literal["json", "table", "repr"] = "json"
+    source_tokens: int = Field(
+        default=0,
+        description="Estimated tokens of the full, unwindowed state fields (for savings stats)",
+    )
+    positive_evidence: str = "[]"
+    negative_evidence: str = "[]"
+    diagnoses: str = "[]"
+    reasoning_summary: str = ""
+    reasoning_chain: str = "[]"
+    diagnosis_strategy: str = "{}"
+    evidence_delta: str = "[]"
+    diagnoses_delta: str = "[]"
+
+
 class MiniCDSSState(BaseModel):
     # Core Data From DB/Redis
     initial_patient_notes: str = Field(
@@ -325,3 +349,8 @@ class MiniCDSSState(BaseModel):
     differential_diagnosis_output: DifferentialDiagnosisAgentOutput | None = None
     evidence_audit_output: EvidenceAuditerOutput | None = None
     diagnosis_audit_output: DiagnosisAuditerOutput | None = None
+
+    # Derived (memoized prompt rendering of the state above). Only the graph's own
+    # checkpoints carry it: it is never serialized, so a client-supplied memo is
+    # dropped before the job payload reaches a worker
+    prompt_context: PromptContext | None = Field(default=None, exclude=True)
@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Any, Literal
+from uuid import uuid4
+from pydantic import BaseModel, Field
+from app.core.config import GRAPH_RUN_TIMEOUT_SECONDS
+from app.models.graph import MiniCDSSState
+
+GraphJobStatus = Literal[
+    "queued", "running", "succeeded", "failed", "cancelled", "timed_out"
+]
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "timed_out")
+
+
+## Request body for a graph run
+class GraphJobCreate(BaseModel):
+    state: MiniCDSSState | None = Field(
+        default=None,
+        description="Input for a new run; omit to resume the session's interrupted run",
+    )
+    timeout_seconds: float = Field(
+        default=GRAPH_RUN_TIMEOUT_SECONDS,
+        gt=0,
+        description="Deadline for the run, counted from when a worker starts it",
+    )
+    stream_partials: bool = Field(
+        default=False,
+        description="Publish agent fields as they stream in; streamed calls are neither hedged nor coalesced",
+    )
+
+
+## Job record kept in Redis (without the result payload)
+class GraphJob(BaseModel):
+    id: str = Field(default_factory=lambda: uuid4().hex)
+    ses_id: str
+    status: GraphJobStatus = "queued"
+    attempts: int = 0
+    timeout_seconds: float = GRAPH_RUN_TIMEOUT_SECONDS
+    stream_partials: bool = False
+    error: str | None = None
+    completed_nodes: list[str] = []
+    enqueued_at: datetime = Field(default_factory=lambda: datetime.now())
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class GraphJobResult(BaseModel):
+    id: str
+    status: GraphJobStatus
+    result: MiniCDSSState | None = None
+    partial: dict[str, Any] | None = Field(
+        default=None,
+        description="Outputs of the nodes (and streamed fields) finished before a failure, cancel or timeout",
+    )
+
+
+## Acknowledges a doctor edit folded into the session's next (debounced) run
+class DebouncedRun(BaseModel):
+    ses_id: str
+    pending_evidence_changes: int
+    pending_diagnoses_changes: int
+    superseded_job_id: str | None = None
+    runs_in_seconds: float
@@ -38,6 +38,20 @@ class SessionInitializationResult(BaseModel):
     question: str
 
 
+## Single-call intake: eligibility plus the initialization, left empty when ineligible
+class SessionIntakeResult(SessionEligibilityResult):
+    positives: list[str] = Field(
+        default_factory=list, description="List of all the positive symptoms"
+    )
+    negatives: list[str] = Field(
+        default_factory=list, description="List of all the negative symptoms"
+    )
+    safety_checklist: list[str] = Field(
+        default_factory=list, description="List of safety concerns raised"
+    )
+    question: str = ""
+
+
 ## Session Creation
 class SessionCreate(SessionBase):
     doc_id: str
@@ -1,7 +1,86 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Annotated, Any, Literal
+from pydantic import BaseModel, Field
+from app.models.graph import (
+    ClinicalMetric,
+    Diagnosis,
+    DiagnosticStrategy,
+    Evidence,
+    ReasoningStep,
+)
 
 
 ## Used for Login & shared by all
 class WSIncomming(BaseModel):
     action: str
     payload: dict
+
+
+#### OUTGOING GRAPH EVENTS (pushed to /ws-dashboard/{session_id}) ####
+
+
+class GraphEventBase(BaseModel):
+    ses_id: str
+    job_id: str | None = None
+    timestamp: datetime = Field(default_factory=lambda: datetime.now())
+
+
+class NodeStartedEvent(GraphEventBase):
+    type: Literal["node_started"] = "node_started"
+    node: str
+
+
+class NodeFinishedEvent(GraphEventBase):
+    type: Literal["node_finished"] = "node_finished"
+    node: str
+    duration_seconds: float
+    error: str | None = None
+
+
+class PartialFieldEvent(GraphEventBase):
+    type: Literal["partial"] = "partial"
+    node: str
+    path: str
+    value: Any
+
+
+class DifferentialStrategyEvent(GraphEventBase):
+    type: Literal["differential_strategy"] = "differential_strategy"
+    reasoning_step: ReasoningStep
+    strategy: DiagnosticStrategy
+    diagnosis_summary: str
+
+
+class EvidenceUpdateEvent(GraphEventBase):
+    type: Literal["evidence_update"] = "evidence_update"
+    new_ai_evidences: list[Evidence]
+    updated_ai_evidences: list[Evidence]
+    redundant_ai_evidence_ids: list[str]
+    doctor_advisory_note: str
+
+
+class DiagnosisUpdateEvent(GraphEventBase):
+    type: Literal["diagnosis_update"] = "diagnosis_update"
+    new_ai_diagnoses: list[Diagnosis]
+    updated_ai_diagnoses: list[Diagnosis]
+    redundant_ai_diagnosis_ids: list[str]
+    confidence_updates: dict[str, ClinicalMetric]
+
+
+class RunFinishedEvent(GraphEventBase):
+    type: Literal["run_finished"] = "run_finished"
+    status: Literal["succeeded", "failed", "cancelled", "timed_out"]
+    duration_seconds: float
+    error: str | None = None
+
+
+GraphEvent = Annotated[
+    NodeStartedEvent
+    | NodeFinishedEvent
+    | PartialFieldEvent
+    | DifferentialStrategyEvent
+    | EvidenceUpdateEvent
+    | DiagnosisUpdateEvent
+    | RunFinishedEvent,
+    Field(discriminator="type"),
+]
@@ -1,8 +1,10 @@
 import redis
+import redis.asyncio as aioredis
 from redis import Redis
 from app.core.config import REDIS_URI
 
 _client: Redis | None = None
+_async_client: aioredis.Redis | None = None
 
 
 def get_client():
@@ -17,6 +19,19 @@ def get_client():
     return _client
 
 
+## Non-blocking client for use on the request/graph hot path
+def get_async_client():
+    global _async_client
+
+    if _async_client is None:
+        if not REDIS_URI:
+            raise Exception("REDIS_URI is not set in environment")
+
+        _async_client = aioredis.from_url(REDIS_URI, decode_responses=True)
+
+    return _async_client
+
+
 def close_connection():
     global _client
     try:
@@ -26,3 +41,14 @@ def close_connection():
             print("Closing Redis Connection")
     except Exception as e:
         print("Ran into error with closing Redis connection: ", e)
+
+
+async def close_async_connection():
+    global _async_client
+    try:
+        if _async_client is not None:
+            await _async_client.aclose()
+            _async_client = None
+            print("Closing async Redis Connection")
+    except Exception as e:
+        print("Ran into error with closing async Redis connection: ", e)
@@ -0,0 +1,99 @@
+import json
+import zlib
+from app.core.config import GRAPH_JOB_PARTITIONS, GRAPH_JOB_TTL_SECONDS
+from app.models.graph import MiniCDSSState
+from app.models.jobs import FINISHED_STATUSES, GraphJob
+from app.redis.client import get_async_client
+
+JOB_PREFIX = "graph_job"
+STREAM_PREFIX = "graph_jobs"
+STREAM_MAX_LEN = 10000
+CANCEL_CHANNEL = "graph_job_cancel"  # pub/sub; message is the job id
+
+
+## Every job of a session lands on the same stream, which one worker drains in order
+def partition_for(ses_id: str) -> int:
+    return zlib.crc32(ses_id.encode()) % GRAPH_JOB_PARTITIONS
+
+
+def stream_key(partition: int) -> str:
+    return f"{STREAM_PREFIX}:{partition}"
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}:{job_id}"
+
+
+def _session_jobs_key(ses_id: str) -> str:
+    return f"{JOB_PREFIX}:session:{ses_id}"  # ids of the session's unfinished jobs
+
+
+async def insert_job(job: GraphJob, state: MiniCDSSState | None) -> str:
+    client = get_async_client()
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job.id), "job", job.model_dump_json())
+        pipe.expire(_job_key(job.id), GRAPH_JOB_TTL_SECONDS)
+        pipe.sadd(_session_jobs_key(job.ses_id), job.id)
+        pipe.expire(_session_jobs_key(job.ses_id), GRAPH_JOB_TTL_SECONDS)
+        pipe.xadd(
+            stream_key(partition_for(job.ses_id)),
+            {
+                "job_id": job.id,
+                "ses_id": job.ses_id,
+                "state": state.model_dump_json() if state else "",
+            },
+            maxlen=STREAM_MAX_LEN,
+            approximate=True,
+        )
+        await pipe.execute()
+    return job.id
+
+
+async def find_job_by_id(job_id: str) -> GraphJob | None:
+    raw = await get_async_client().hget(_job_key(job_id), "job")
+    return GraphJob.model_validate_json(raw) if raw else None
+
+
+async def find_job_result(job_id: str) -> MiniCDSSState | None:
+    raw = await get_async_client().hget(_job_key(job_id), "result")
+    return MiniCDSSState.model_validate_json(raw) if raw else None
+
+
+async def find_job_partial(job_id: str) -> dict | None:
+    raw = await get_async_client().hget(_job_key(job_id), "partial")
+    return json.loads(raw) if raw else None
+
+
+async def find_active_job_ids(ses_id: str) -> list[str]:
+    return list(await get_async_client().smembers(_session_jobs_key(ses_id)))
+
+
+async def update_job(
+    job: GraphJob,
+    result: MiniCDSSState | None = None,
+    partial: dict | None = None,
+):
+    fields = {"job": job.model_dump_json()}
+    if result is not None:
+        fields["result"] = result.model_dump_json()
+    if partial:
+        fields["partial"] = json.dumps(partial)
+
+    client = get_async_client()
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job.id), mapping=fields)
+        if job.status in FINISHED_STATUSES:
+            pipe.srem(_session_jobs_key(job.ses_id), job.id)
+        await pipe.execute()
+
+
+## Flags the job (for a worker that has not picked it up yet) and signals the
+## worker that is running it
+async def request_job_cancel(job_id: str):
+    client = get_async_client()
+    await client.hset(_job_key(job_id), "cancel_requested", "1")
+    await client.publish(CANCEL_CHANNEL, job_id)
+
+
+async def is_cancel_requested(job_id: str) -> bool:
+    return bool(await get_async_client().hexists(_job_key(job_id), "cancel_requested"))
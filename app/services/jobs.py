@@ -0,0 +1,87 @@
+from app.models.graph import MiniCDSSState
+from datetime import datetime
+from app.core.config import GRAPH_RUN_TIMEOUT_SECONDS
+from app.models.jobs import FINISHED_STATUSES, GraphJob, GraphJobCreate, GraphJobResult
+from app.repositories.jobs import (
+    find_active_job_ids,
+    find_job_by_id,
+    find_job_partial,
+    find_job_result,
+    insert_job,
+    request_job_cancel,
+    update_job,
+)
+from app.repositories.sessions import find_session_by_id
+from app.models.error import UserFacingError
+
+
+async def enqueue_graph_run(
+    ses_id: str,
+    state: MiniCDSSState | None,
+    timeout_seconds: float = GRAPH_RUN_TIMEOUT_SECONDS,
+    stream_partials: bool = False,
+) -> GraphJob:
+    job = GraphJob(
+        ses_id=ses_id, timeout_seconds=timeout_seconds, stream_partials=stream_partials
+    )
+    await insert_job(job, state)
+    return job
+
+
+async def ensure_session_exists(ses_id: str):
+    ## Verify that ses_id exist as a valid entry
+    if await find_session_by_id(ses_id) is None:
+        raise UserFacingError(f"{ses_id} session not found")
+
+
+async def create_graph_job(ses_id: str, data: GraphJobCreate) -> GraphJob:
+    await ensure_session_exists(ses_id)
+
+    return await enqueue_graph_run(
+        ses_id, data.state, data.timeout_seconds, data.stream_partials
+    )
+
+
+async def get_job(job_id: str) -> GraphJob:
+    job = await find_job_by_id(job_id)
+
+    if job is None:
+        raise UserFacingError(f"{job_id} job not found")
+
+    return job
+
+
+async def get_job_result(job_id: str) -> GraphJobResult:
+    job = await get_job(job_id)
+
+    if job.status == "succeeded":
+        return GraphJobResult(
+            id=job.id, status=job.status, result=await find_job_result(job_id)
+        )
+    return GraphJobResult(
+        id=job.id, status=job.status, partial=await find_job_partial(job_id)
+    )
+
+
+async def cancel_job(job_id: str) -> GraphJob:
+    job = await get_job(job_id)
+    if job.status in FINISHED_STATUSES:
+        return job
+
+    await request_job_cancel(job_id)
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.now()
+        await update_job(job)
+    return job
+
+
+## Cancels every queued or running job of a session (e.g. when it is closed)
+async def cancel_session_jobs(ses_id: str) -> list[GraphJob]:
+    cancelled = []
+    for job_id in await find_active_job_ids(ses_id):
+        try:
+            cancelled.append(await cancel_job(job_id))
+        except UserFacingError:
+            continue  ## Job record already expired
+    return cancelled
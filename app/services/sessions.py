@@ -19,11 +19,10 @@ from app.repositories.sessions import (
 from app.repositories.doctors import find_doctor_by_id
 from app.repositories.patients import insert_patient
 from app.db.client import get_client
-from app.ai.sessions import (
-    validate_content_before_session_creation,
-    initialize_session_differential_diagnosis,
-)
+from app.ai.sessions import run_session_intake
 from app.models.error import UserFacingError
+from app.services.jobs import cancel_session_jobs
+from app.workflow.debouncer import session_debouncer
 
 
 async def create_session(data: SessionCreate) -> SessionPublicDeep:
@@ -44,16 +43,13 @@ async def create_session(data: SessionCreate) -> SessionPublicDeep:
         gender=data.pat_gender,
     )
 
-    decision = await validate_content_before_session_creation(
+    ## Eligibility and initialization run per SESSION_INTAKE_MODE (concurrent by default)
+    decision, initial_state = await run_session_intake(
         data.pat_age, data.pat_gender, data.pat_note
     )
-    if not decision.eligible:
+    if initial_state is None:
         raise UserFacingError(decision.reasoning)
 
-    initial_state = await initialize_session_differential_diagnosis(
-        data.pat_age, data.pat_gender, data.pat_note
-    )
-
     ## Build a session dict
     session_kwargs = {
         "id": new_session_id,
@@ -120,4 +116,8 @@ async def delete_session(ses_id: str) -> SessionPublicDeep:
     if deleted_session is None:
         raise ValueError(f"{ses_id} session not found")
 
+    ## Stop burning LLM capacity on a session that no longer exists
+    session_debouncer.discard(ses_id)
+    await cancel_session_jobs(ses_id)
+
     return SessionPublicDeep.model_validate(deleted_session, from_attributes=True)
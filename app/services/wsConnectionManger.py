@@ -1,11 +1,25 @@
+import asyncio
 from typing import Any
 from fastapi import WebSocket
+from pydantic import BaseModel
 import json
+from app.redis.client import get_async_client
+
+## Graph events are published per session; every API process relays the ones
+## whose session has a socket connected to it
+SESSION_EVENTS_PREFIX = "session_events"
+
+
+async def publish_session_event(event: BaseModel):
+    await get_async_client().publish(
+        f"{SESSION_EVENTS_PREFIX}:{event.ses_id}", event.model_dump_json()
+    )
 
 
 class ConnectionManager:
     def __init__(self) -> None:
         self.active_sessions: dict[str, list[WebSocket]] = {}
+        self.relay_task: asyncio.Task | None = None
 
     async def connect(self, websocket: WebSocket, ses_id: str):
         await websocket.accept()
@@ -21,10 +35,36 @@ class ConnectionManager:
 
     async def send_message(self, msg: str, ses_id: str):
         if ses_id in self.active_sessions:
-            for socket in self.active_sessions[ses_id]:
+            for socket in list(self.active_sessions[ses_id]):
                 await socket.send_text(msg)
 
     async def send_payload(self, payload: dict[str, Any], ses_id: str):
         if ses_id in self.active_sessions:
-            for socket in self.active_sessions[ses_id]:
+            for socket in list(self.active_sessions[ses_id]):
                 await socket.send_json(payload)
+
+    async def _relay(self):
+        pubsub = get_async_client().pubsub(ignore_subscribe_messages=True)
+        await pubsub.psubscribe(f"{SESSION_EVENTS_PREFIX}:*")
+        try:
+            async for message in pubsub.listen():
+                ses_id = message["channel"].removeprefix(f"{SESSION_EVENTS_PREFIX}:")
+                try:
+                    await self.send_message(message["data"], ses_id)
+                except Exception as e:
+                    print(f"Dropping graph event for session {ses_id}: {e}")
+        finally:
+            await pubsub.aclose()
+
+    async def start_relay(self):
+        if self.relay_task is None:
+            self.relay_task = asyncio.create_task(self._relay())
+
+    async def stop_relay(self):
+        if self.relay_task is not None:
+            self.relay_task.cancel()
+            await asyncio.gather(self.relay_task, return_exceptions=True)
+            self.relay_task = None
+
+
+connection_manager = ConnectionManager()
@@ -0,0 +1,267 @@
+import base64
+import inspect
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Sequence
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from app.models import graph as graph_models
+from app.core.config import GRAPH_CHECKPOINT_KEEP_LAST, GRAPH_CHECKPOINT_TTL_SECONDS
+from app.redis.client import get_async_client
+
+CHECKPOINT_PREFIX = "graph_checkpoint"
+
+## Only our own state models may be rebuilt from a checkpoint
+STATE_TYPES = [
+    obj
+    for _, obj in inspect.getmembers(graph_models, inspect.isclass)
+    if issubclass(obj, (BaseModel, Enum)) and obj.__module__ == graph_models.__name__
+]
+
+###########################################################################
+# Key layout (thread_id == session id, ns == "" for the top-level graph):
+#   graph_checkpoint:{thread}:namespaces           set of namespaces
+#   graph_checkpoint:{thread}:{ns}:index           zset of checkpoint ids (lex order)
+#   graph_checkpoint:{thread}:{ns}:{id}            hash: checkpoint / metadata / parent_id
+#   graph_checkpoint:{thread}:{ns}:{id}:writes     hash: pending writes of that step
+# Checkpoints hold every channel value, so dropping old ones never breaks newer ones.
+###########################################################################
+
+
+def _namespaces_key(thread_id: str) -> str:
+    return f"{CHECKPOINT_PREFIX}:{thread_id}:namespaces"
+
+
+def _index_key(thread_id: str, checkpoint_ns: str) -> str:
+    return f"{CHECKPOINT_PREFIX}:{thread_id}:{checkpoint_ns}:index"
+
+
+def _checkpoint_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+    return f"{CHECKPOINT_PREFIX}:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+
+def _writes_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+    return f"{_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)}:writes"
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint_id,
+        }
+    }
+
+
+### LangGraph checkpoint saver persisting per-session graph state in Redis
+class RedisCheckpointSaver(BaseCheckpointSaver[str]):
+    def __init__(
+        self,
+        keep_last: int = GRAPH_CHECKPOINT_KEEP_LAST,
+        ttl_seconds: int = GRAPH_CHECKPOINT_TTL_SECONDS,
+    ):
+        super().__init__(serde=JsonPlusSerializer(allowed_msgpack_modules=STATE_TYPES))
+        self.keep_last = max(keep_last, 2)  # the resumed step and its parent
+        self.ttl_seconds = ttl_seconds
+
+    ## The client decodes responses, so serialized bytes travel as base64 text
+    def _dump(self, value: Any) -> str:
+        type_, data = self.serde.dumps_typed(value)
+        return f"{type_}:{base64.b64encode(data).decode()}"
+
+    def _load(self, raw: str) -> Any:
+        type_, data = raw.split(":", 1)
+        return self.serde.loads_typed((type_, base64.b64decode(data)))
+
+    async def _load_tuple(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> CheckpointTuple | None:
+        client = get_async_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+            pipe.hvals(_writes_key(thread_id, checkpoint_ns, checkpoint_id))
+            saved, writes = await pipe.execute()
+        if not saved:
+            return None
+
+        pending = [json.loads(entry) for entry in writes]
+        pending.sort(
+            key=lambda w: writes_sort_key(w["task_path"], w["task_id"], w["idx"])
+        )
+        parent_id = saved.get("parent_id")
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self._load(saved["checkpoint"]),
+            metadata=self._load(saved["metadata"]),
+            parent_config=(
+                _config(thread_id, checkpoint_ns, parent_id) if parent_id else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self._load(w["value"])) for w in pending
+            ],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            latest = await get_async_client().zrevrangebylex(
+                _index_key(thread_id, checkpoint_ns), "+", "-", start=0, num=1
+            )
+            if not latest:
+                return None
+            checkpoint_id = latest[0]
+        return await self._load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        ## Listing is scoped to one session; there is no global scan across threads
+        if config is None:
+            return
+        client = get_async_client()
+        thread_id = config["configurable"]["thread_id"]
+        config_ns = config["configurable"].get("checkpoint_ns")
+        config_id = get_checkpoint_id(config)
+        before_id = get_checkpoint_id(before) if before else None
+
+        namespaces = (
+            [config_ns]
+            if config_ns is not None
+            else sorted(await client.smembers(_namespaces_key(thread_id)))
+        )
+        for checkpoint_ns in namespaces:
+            ids = await client.zrevrangebylex(
+                _index_key(thread_id, checkpoint_ns),
+                f"({before_id}" if before_id else "+",
+                "-",
+            )
+            for checkpoint_id in ids:
+                if config_id and checkpoint_id != config_id:
+                    continue
+                if limit is not None and limit <= 0:
+                    return
+                found = await self._load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+                if found is None:
+                    continue  ## Compacted away between the index read and the load
+                if filter and not all(
+                    found.metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                if limit is not None:
+                    limit -= 1
+                yield found
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = checkpoint["id"]
+        key = _checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+        index_key = _index_key(thread_id, checkpoint_ns)
+
+        client = get_async_client()
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    "checkpoint": self._dump(checkpoint),
+                    "metadata": self._dump(get_checkpoint_metadata(config, metadata)),
+                    "parent_id": config["configurable"].get("checkpoint_id") or "",
+                },
+            )
+            pipe.zadd(index_key, {checkpoint_id: 0})
+            pipe.sadd(_namespaces_key(thread_id), checkpoint_ns)
+            for expiring in (key, index_key, _namespaces_key(thread_id)):
+                pipe.expire(expiring, self.ttl_seconds)
+            await pipe.execute()
+
+        await self._compact(thread_id, checkpoint_ns)
+        return _config(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = _writes_key(thread_id, checkpoint_ns, checkpoint_id)
+
+        client = get_async_client()
+        async with client.pipeline(transaction=True) as pipe:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                entry = json.dumps(
+                    {
+                        "task_id": task_id,
+                        "task_path": task_path,
+                        "idx": idx,
+                        "channel": channel,
+                        "value": self._dump(value),
+                    }
+                )
+                ## Regular writes are first-wins (retries must not duplicate them);
+                ## special channels (errors, interrupts) are overwritten
+                if idx >= 0:
+                    pipe.hsetnx(key, f"{task_id}:{idx}", entry)
+                else:
+                    pipe.hset(key, f"{task_id}:{idx}", entry)
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    ## Keeps only the newest `keep_last` checkpoints (and their writes) per namespace
+    async def _compact(self, thread_id: str, checkpoint_ns: str):
+        client = get_async_client()
+        index_key = _index_key(thread_id, checkpoint_ns)
+        excess = await client.zcard(index_key) - self.keep_last
+        if excess <= 0:
+            return
+
+        stale = await client.zrangebylex(index_key, "-", "+", start=0, num=excess)
+        async with client.pipeline(transaction=True) as pipe:
+            for checkpoint_id in stale:
+                pipe.delete(
+                    _checkpoint_key(thread_id, checkpoint_ns, checkpoint_id),
+                    _writes_key(thread_id, checkpoint_ns, checkpoint_id),
+                )
+            pipe.zrem(index_key, *stale)
+            await pipe.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        client = get_async_client()
+        keys = [
+            key
+            async for key in client.scan_iter(
+                match=f"{CHECKPOINT_PREFIX}:{thread_id}:*"
+            )
+        ]
+        if keys:
+            await client.delete(*keys)
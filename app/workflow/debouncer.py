@@ -0,0 +1,176 @@
+import asyncio
+from typing import TypeVar
+from app.core.config import GRAPH_DEBOUNCE_SECONDS
+from app.models.graph import (
+    Diagnosis,
+    DiagnosesDelta,
+    Evidence,
+    EvidenceDelta,
+    MiniCDSSState,
+)
+from app.models.jobs import DebouncedRun
+from app.repositories.jobs import find_job_by_id
+from app.services.jobs import cancel_job, enqueue_graph_run
+
+Item = TypeVar("Item", Evidence, Diagnosis)
+
+
+### Folds a burst of deltas into one: add+remove of the same id cancels out,
+### and the latest version of a re-added entry wins
+def merge_items(
+    deltas: list[EvidenceDelta] | list[DiagnosesDelta],
+) -> tuple[list[Item], list[Item]]:
+    added: dict[str, Item] = {}
+    removed: dict[str, Item] = {}
+    for delta in deltas:
+        for item in delta.added:
+            removed.pop(item.id, None)
+            added[item.id] = item
+        for item in delta.removed:
+            if added.pop(item.id, None) is None:
+                removed[item.id] = item
+    return list(added.values()), list(removed.values())
+
+
+def merge_evidence_deltas(deltas: list[EvidenceDelta]) -> list[EvidenceDelta]:
+    added, removed = merge_items(deltas)
+    return [EvidenceDelta(added=added, removed=removed)] if added or removed else []
+
+
+def merge_diagnoses_deltas(deltas: list[DiagnosesDelta]) -> list[DiagnosesDelta]:
+    added, removed = merge_items(deltas)
+    return [DiagnosesDelta(added=added, removed=removed)] if added or removed else []
+
+
+class _PendingRun:
+    def __init__(self):
+        self.state: MiniCDSSState | None = None
+        self.evidence_delta: list[EvidenceDelta] = []
+        self.diagnoses_delta: list[DiagnosesDelta] = []
+        self.timer: asyncio.Task | None = None
+        self.lock = asyncio.Lock()  # orders edits against the timer's enqueue
+        ## Last launched run and the deltas it carried (re-sent if it gets superseded)
+        self.job_id: str | None = None
+        self.sent_evidence_delta: list[EvidenceDelta] = []
+        self.sent_diagnoses_delta: list[DiagnosesDelta] = []
+
+
+###########################################################################
+# One graph run per editing burst: edits reset a per-session quiet window,
+# and a run still queued/in flight when new edits arrive is cancelled and
+# its deltas are merged into the next one.
+# (In-process: a session's edits are expected to reach the same API worker.)
+###########################################################################
+class SessionDebouncer:
+    def __init__(self, quiet_seconds: float = GRAPH_DEBOUNCE_SECONDS):
+        self.quiet_seconds = quiet_seconds
+        self.poll_seconds = max(quiet_seconds, 1.0)  # job status checks before eviction
+        self.pending: dict[str, _PendingRun] = {}
+        self._stats = {"edits": 0, "runs": 0, "superseded": 0}
+
+    async def submit(self, ses_id: str, state: MiniCDSSState) -> DebouncedRun:
+        self._stats["edits"] += 1
+        run = self.pending.setdefault(ses_id, _PendingRun())
+        async with run.lock:
+            if run.timer is not None:
+                run.timer.cancel()
+            superseded = await self._settle_previous(run)
+
+            run.state = state
+            run.evidence_delta += state.evidence_delta
+            run.diagnoses_delta += state.diagnoses_delta
+            run.timer = asyncio.create_task(self._fire(ses_id, run))
+
+        return DebouncedRun(
+            ses_id=ses_id,
+            pending_evidence_changes=sum(
+                len(d.added) + len(d.removed)
+                for d in merge_evidence_deltas(
+                    run.sent_evidence_delta + run.evidence_delta
+                )
+            ),
+            pending_diagnoses_changes=sum(
+                len(d.added) + len(d.removed)
+                for d in merge_diagnoses_deltas(
+                    run.sent_diagnoses_delta + run.diagnoses_delta
+                )
+            ),
+            superseded_job_id=superseded,
+            runs_in_seconds=self.quiet_seconds,
+        )
+
+    ## Returns the id of the run it cancelled, if any
+    async def _settle_previous(self, run: _PendingRun) -> str | None:
+        if run.job_id is None:
+            return None
+        job_id, run.job_id = run.job_id, None
+
+        job = await find_job_by_id(job_id)
+        if job is not None and job.status == "succeeded":
+            run.sent_evidence_delta, run.sent_diagnoses_delta = [], []
+            return None
+        if job is not None and job.status in ("queued", "running"):
+            await cancel_job(job_id)
+            self._stats["superseded"] += 1
+            return job_id
+        return None  ## Failed/cancelled/expired: its deltas ride along again
+
+    async def _fire(self, ses_id: str, run: _PendingRun):
+        await asyncio.sleep(self.quiet_seconds)
+        async with run.lock:
+            run.timer = None
+            evidence_delta = merge_evidence_deltas(
+                run.sent_evidence_delta + run.evidence_delta
+            )
+            diagnoses_delta = merge_diagnoses_deltas(
+                run.sent_diagnoses_delta + run.diagnoses_delta
+            )
+            state = run.state.model_copy(
+                update={
+                    "last_mutation_source": "UI",
+                    "evidence_delta": evidence_delta,
+                    "diagnoses_delta": diagnoses_delta,
+                }
+            )
+            job = await enqueue_graph_run(ses_id, state)
+            self._stats["runs"] += 1
+
+            run.job_id = job.id
+            run.sent_evidence_delta = evidence_delta
+            run.sent_diagnoses_delta = diagnoses_delta
+            run.evidence_delta, run.diagnoses_delta = [], []
+        await self._evict_when_done(ses_id, run, job.id)
+
+    ## Forgets the session once its run succeeded and no edits arrived since. A failed
+    ## run is kept until its job record expires, so its deltas ride along with the
+    ## next edit as before
+    async def _evict_when_done(self, ses_id: str, run: _PendingRun, job_id: str):
+        while run.job_id == job_id and self.pending.get(ses_id) is run:
+            job = await find_job_by_id(job_id)
+            if job is None or job.status == "succeeded":
+                async with run.lock:
+                    if (
+                        run.job_id == job_id
+                        and run.timer is None
+                        and self.pending.get(ses_id) is run
+                    ):
+                        del self.pending[ses_id]
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    ## Drops the session's buffered edits (and its pending timer)
+    def discard(self, ses_id: str):
+        run = self.pending.pop(ses_id, None)
+        if run is not None and run.timer is not None:
+            run.timer.cancel()
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "sessions_waiting": sum(
+                1 for run in self.pending.values() if run.timer is not None
+            ),
+        }
+
+
+session_debouncer = SessionDebouncer()
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from pydantic import BaseModel
+from app.models.graph import MiniCDSSState
+from app.models.socket import (
+    DiagnosisUpdateEvent,
+    DifferentialStrategyEvent,
+    EvidenceUpdateEvent,
+    NodeFinishedEvent,
+    NodeStartedEvent,
+    PartialFieldEvent,
+    RunFinishedEvent,
+)
+from app.services.wsConnectionManger import publish_session_event
+from app.workflow.graph import DeadlineExceeded, compiled_graph, session_config
+
+
+## Typed events for the outputs a finished node wrote to the state
+def output_events(result: dict, ses_id: str, job_id: str | None) -> list:
+    events = []
+    if differential := result.get("differential_diagnosis_output"):
+        events.append(
+            DifferentialStrategyEvent(
+                ses_id=ses_id,
+                job_id=job_id,
+                reasoning_step=differential.current_reasoning_step,
+                strategy=differential.strategy,
+                diagnosis_summary=differential.diagnosis_summary,
+            )
+        )
+    if evidence := result.get("evidence_audit_output"):
+        events.append(
+            EvidenceUpdateEvent(
+                ses_id=ses_id,
+                job_id=job_id,
+                **evidence.model_dump(
+                    include={
+                        "new_ai_evidences",
+                        "updated_ai_evidences",
+                        "redundant_ai_evidence_ids",
+                        "doctor_advisory_note",
+                    }
+                ),
+            )
+        )
+    if diagnosis := result.get("diagnosis_audit_output"):
+        events.append(
+            DiagnosisUpdateEvent(
+                ses_id=ses_id,
+                job_id=job_id,
+                **diagnosis.model_dump(
+                    include={
+                        "new_ai_diagnoses",
+                        "updated_ai_diagnoses",
+                        "redundant_ai_diagnosis_ids",
+                        "confidence_updates",
+                    }
+                ),
+            )
+        )
+    return events
+
+
+def _jsonable(value):
+    return value.model_dump(mode="json") if isinstance(value, BaseModel) else value
+
+
+### Same as run_session_graph, but pushes node progress and outputs to the
+### session's sockets as they happen. `progress` collects finished node outputs
+### ("nodes") and streamed fields ("fields") so an aborted run can be diagnosed.
+### Agents only stream their fields when the caller passes stream_partials=True.
+async def stream_session_graph(
+    session_id: str,
+    state: MiniCDSSState | None = None,
+    progress: dict | None = None,
+    **configurable,
+) -> dict:
+    progress = progress if progress is not None else {}
+    progress.setdefault("nodes", {})
+    progress.setdefault("fields", {})
+    job_id = configurable.get("job_id")
+    config = session_config(session_id, **configurable)
+    started: dict[str, float] = {}
+    final: dict = {}
+    starttime = time.perf_counter()
+
+    try:
+        async for mode, chunk in compiled_graph.astream(
+            state, config, stream_mode=["tasks", "custom", "values"]
+        ):
+            if mode == "values":
+                final = chunk
+            elif mode == "custom":
+                progress["fields"].setdefault(chunk["node"], {})[chunk["path"]] = chunk[
+                    "value"
+                ]
+                await publish_session_event(
+                    PartialFieldEvent(
+                        ses_id=session_id,
+                        job_id=job_id,
+                        node=chunk["node"],
+                        path=chunk["path"],
+                        value=chunk["value"],
+                    )
+                )
+            elif "input" in chunk:  ## Task started
+                started[chunk["id"]] = time.perf_counter()
+                await publish_session_event(
+                    NodeStartedEvent(
+                        ses_id=session_id, job_id=job_id, node=chunk["name"]
+                    )
+                )
+            else:  ## Task finished
+                duration = time.perf_counter() - started.pop(chunk["id"], starttime)
+                await publish_session_event(
+                    NodeFinishedEvent(
+                        ses_id=session_id,
+                        job_id=job_id,
+                        node=chunk["name"],
+                        duration_seconds=round(duration, 3),
+                        error=str(chunk["error"]) if chunk["error"] else None,
+                    )
+                )
+                if not chunk["error"]:
+                    progress["nodes"][chunk["name"]] = {
+                        key: _jsonable(value)
+                        for key, value in (chunk["result"] or {}).items()
+                    }
+                for event in output_events(chunk["result"] or {}, session_id, job_id):
+                    await publish_session_event(event)
+
+    except asyncio.CancelledError:
+        await publish_session_event(
+            RunFinishedEvent(
+                ses_id=session_id,
+                job_id=job_id,
+                status="cancelled",
+                duration_seconds=round(time.perf_counter() - starttime, 3),
+            )
+        )
+        raise
+    except Exception as e:
+        await publish_session_event(
+            RunFinishedEvent(
+                ses_id=session_id,
+                job_id=job_id,
+                status="timed_out" if isinstance(e, DeadlineExceeded) else "failed",
+                duration_seconds=round(time.perf_counter() - starttime, 3),
+                error=str(e) or type(e).__name__,
+            )
+        )
+        raise
+
+    await publish_session_event(
+        RunFinishedEvent(
+            ses_id=session_id,
+            job_id=job_id,
+            status="succeeded",
+            duration_seconds=round(time.perf_counter() - starttime, 3),
+        )
+    )
+    return final
@@ -1,38 +1,94 @@
 from langgraph.graph import StateGraph, END, START
 from langgraph.types import RetryPolicy
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import RunnableConfig
+from typing import Literal
+from contextlib import asynccontextmanager
+import asyncio
 import time
-from app.models.graph import MiniCDSSState, DifferentialDiagnosisAgentOutput
-from app.ai.differential import carry_diagnosis
-from app.ai.evidence import audit_evidence
-from app.ai.diagnosis import audit_diagnoses
+from app.core.config import GRAPH_AUDITOR_MODE, GRAPH_LOCAL_RESCORING
+from app.models.graph import (
+    MiniCDSSState,
+    DiagnosisAuditerMeta,
+    DiagnosisAuditerOutput,
+    DifferentialDiagnosisAgentOutput,
+)
+from app.ai.differential import carry_diagnosis, DIFFERENTIAL_CONTEXT_BUDGET
+from app.ai.evidence import audit_evidence, EVIDENCE_AUDITER_CONTEXT_BUDGET
+from app.ai.diagnosis import audit_diagnoses, DIAGNOSIS_AUDITER_CONTEXT_BUDGET
+from app.ai.context import build_prompt_context, fit_to_budget
+from app.ai.scoring import score_diagnoses
+from app.llm.base import PartialCallback
+from app.workflow.checkpointer import RedisCheckpointSaver
+
+
+## Forwards streamed agent fields to `astream(..., stream_mode="custom")` consumers
+## when the run is started with configurable={"stream_partials": True}
+def partial_emitter(node_name: str, config: RunnableConfig) -> PartialCallback | None:
+    if not config.get("configurable", {}).get("stream_partials"):
+        return None
+
+    writer = get_stream_writer()
+
+    async def on_partial(path: str, value):
+        writer({"event": "partial", "node": node_name, "path": path, "value": value})
+
+    return on_partial
+
+
+## TimeoutError subclass, so LangGraph's default RetryPolicy does not retry it
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+## Bounds a node by the run's deadline (configurable={"deadline": <epoch seconds>});
+## expiry cancels the in-flight LLM call, which aborts its HTTP request
+@asynccontextmanager
+async def run_deadline(node_name: str, config: RunnableConfig):
+    deadline = config.get("configurable", {}).get("deadline")
+    if deadline is None:
+        yield
+        return
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"{node_name} skipped: run deadline already passed")
+
+    timeout = asyncio.timeout(remaining)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        if timeout.expired():
+            raise DeadlineExceeded(f"{node_name} hit the run deadline") from e
+        raise
 
 
-async def differential_diagnosis_node(state: MiniCDSSState):
+async def differential_diagnosis_node(state: MiniCDSSState, config: RunnableConfig):
     node_name = "differential_diagnosis_agent"
     starttime = time.perf_counter()
     print("\n" + "=" * 60)
     print("---DIFFERENTIAL DIAGNOSIS NODE---")
     try:
-        result = await carry_diagnosis(
-            last_mutation_source="UI",
-            positive_evidence=[entry.model_dump() for entry in state.positive_evidence],
-            negative_evidence=[entry.model_dump() for entry in state.negative_evidence],
-            diagnoses=[entry.model_dump() for entry in state.diagnoses],
-            reasoning_chain=[entry.model_dump() for entry in state.reasoning_chain],
-            diagnosis_summary=state.diagnosis_summary,
-            diagnosis_strategy=(
-                state.diagnosis_strategy.model_dump()
-                if state.diagnosis_strategy
-                else {}
-            ),
-            doctor_last_chat=state.doctor_last_chat,
-            evidence_delta=[entry.model_dump() for entry in state.evidence_delta],
-            diagnoses_delta=[entry.model_dump() for entry in state.diagnoses_delta],
-        )
+        async with run_deadline(node_name, config):
+            context = build_prompt_context(state)
+            result = await carry_diagnosis(
+                context=fit_to_budget(state, context, DIFFERENTIAL_CONTEXT_BUDGET),
+                last_mutation_source="UI",
+                diagnosis_summary=state.diagnosis_summary,
+                doctor_last_chat=state.doctor_last_chat,
+                on_partial=partial_emitter(node_name, config),
+            )
 
         duration = round(time.perf_counter() - starttime, 3)
 
-        return {"differential_diagnosis_output": result}
+        ## A new differential output makes the previous run's audits stale
+        return {
+            "differential_diagnosis_output": result,
+            "prompt_context": context,
+            "evidence_audit_output": None,
+            "diagnosis_audit_output": None,
+        }
 
     except Exception as e:
         duration = round(time.perf_counter() - starttime, 3)
@@ -40,38 +96,24 @@ async def differential_diagnosis_node(state: MiniCDSSState):
         raise e  ## Re-raise
 
 
-async def evidence_audit_node(state: MiniCDSSState):
+async def evidence_audit_node(state: MiniCDSSState, config: RunnableConfig):
     node_name = "evidence_audit_agent"
     starttime = time.perf_counter()
     print("\n" + "=" * 60)
     print("---EVIDENCE AUDIT AND BUILDER NODE---")
-    if (
-        state.differential_diagnosis_output is None
-        or state.differential_diagnosis_output.evidence_auditer_meta.should_run == False
-    ):
-        print(
-            f"-- Exiting {node_name}. As no differential diagnosis agent state or command passed. --"
-        )
-        return None
-
     try:
-
-        result = await audit_evidence(
-            differential_diagnosis_output=state.differential_diagnosis_output,
-            initial_patient_notes=state.initial_patient_notes,
-            positive_evidence=[entry.model_dump() for entry in state.positive_evidence],
-            negative_evidence=[entry.model_dump() for entry in state.negative_evidence],
-            diagnoses=[entry.model_dump() for entry in state.diagnoses],
-            reasoning_chain=[entry.model_dump() for entry in state.reasoning_chain],
-            diagnosis_summary=state.diagnosis_summary,
-            diagnosis_strategy=(
-                state.diagnosis_strategy.model_dump()
-                if state.diagnosis_strategy
-                else {}
-            ),
-            evidence_delta=[entry.model_dump() for entry in state.evidence_delta],
-            diagnoses_delta=[entry.model_dump() for entry in state.diagnoses_delta],
-        )
+        async with run_deadline(node_name, config):
+            result = await audit_evidence(
+                differential_diagnosis_output=state.differential_diagnosis_output,
+                context=fit_to_budget(
+                    state,
+                    state.prompt_context or build_prompt_context(state),
+                    EVIDENCE_AUDITER_CONTEXT_BUDGET,
+                ),
+                initial_patient_notes=state.initial_patient_notes,
+                diagnosis_summary=state.diagnosis_summary,
+                on_partial=partial_emitter(node_name, config),
+            )
 
         duration = round(time.perf_counter() - starttime, 3)
 
@@ -83,39 +125,24 @@ async def evidence_audit_node(state: MiniCDSSState):
         raise e  ## Re-raise
 
 
-async def diagnosis_audit_node(state: MiniCDSSState):
+async def diagnosis_audit_node(state: MiniCDSSState, config: RunnableConfig):
     node_name = "diagnosis_audit_agent"
     starttime = time.perf_counter()
     print("\n" + "=" * 60)
     print("---DIAGNOSIS AUDIT AND BUILDER NODE---")
-    if (
-        state.differential_diagnosis_output is None
-        or state.differential_diagnosis_output.diagnosis_auditer_meta.should_run
-        == False
-    ):
-        print(
-            f"-- Exiting {node_name}. As no differential diagnosis agent state or command passed. --"
-        )
-        return None
-
     try:
-
-        result = await audit_diagnoses(
-            differential_diagnosis_output=state.differential_diagnosis_output,
-            initial_patient_notes=state.initial_patient_notes,
-            positive_evidence=[entry.model_dump() for entry in state.positive_evidence],
-            negative_evidence=[entry.model_dump() for entry in state.negative_evidence],
-            diagnoses=[entry.model_dump() for entry in state.diagnoses],
-            reasoning_chain=[entry.model_dump() for entry in state.reasoning_chain],
-            diagnosis_summary=state.diagnosis_summary,
-            diagnosis_strategy=(
-                state.diagnosis_strategy.model_dump()
-                if state.diagnosis_strategy
-                else {}
-            ),
-            evidence_delta=[entry.model_dump() for entry in state.evidence_delta],
-            diagnoses_delta=[entry.model_dump() for entry in state.diagnoses_delta],
-        )
+        async with run_deadline(node_name, config):
+            result = await audit_diagnoses(
+                differential_diagnosis_output=state.differential_diagnosis_output,
+                context=fit_to_budget(
+                    state,
+                    state.prompt_context or build_prompt_context(state),
+                    DIAGNOSIS_AUDITER_CONTEXT_BUDGET,
+                ),
+                initial_patient_notes=state.initial_patient_notes,
+                diagnosis_summary=state.diagnosis_summary,
+                on_partial=partial_emitter(node_name, config),
+            )
 
         duration = round(time.perf_counter() - starttime, 3)
 
@@ -127,34 +154,116 @@ async def diagnosis_audit_node(state: MiniCDSSState):
         raise e  ## Re-raise
 
 
-# Create the graph
-graph = StateGraph(MiniCDSSState)
+## Local stand-in for the diagnosis auditor: recomputes the confidence metrics of
+## every diagnosis from its evidence links, without an LLM call
+async def diagnosis_rescore_node(state: MiniCDSSState):
+    starttime = time.perf_counter()
+    print("\n" + "=" * 60)
+    print("---DIAGNOSIS RESCORING NODE---")
+    updates = score_diagnoses(state)
+    duration = round(time.perf_counter() - starttime, 3)
+    print(f"Rescored {len(updates)} diagnoses in {duration}s")
+    return {
+        "diagnosis_audit_output": DiagnosisAuditerOutput(confidence_updates=updates)
+    }
 
-# Build the Nodes
-graph.add_node(
-    "Differential Diagnosis Agent",
-    differential_diagnosis_node,
-    retry_policy=RetryPolicy(max_attempts=2),
-)
-graph.add_node(
-    "Evidence Builder and Auditer Agent",
-    evidence_audit_node,
-    retry_policy=RetryPolicy(max_attempts=2),
-)
-graph.add_node(
-    "Diagnosis Builder and Auditer Agent",
-    diagnosis_audit_node,
-    retry_policy=RetryPolicy(max_attempts=2),
-)
 
+DIFFERENTIAL_NODE = "Differential Diagnosis Agent"
+EVIDENCE_AUDIT_NODE = "Evidence Builder and Auditer Agent"
+DIAGNOSIS_AUDIT_NODE = "Diagnosis Builder and Auditer Agent"
+DIAGNOSIS_RESCORE_NODE = "Diagnosis Rescoring"
 
-# Connect the Edges
-graph.add_edge(START, "Differential Diagnosis Agent")
-graph.add_edge("Differential Diagnosis Agent", "Evidence Builder and Auditer Agent")
-graph.add_edge(
-    "Evidence Builder and Auditer Agent", "Diagnosis Builder and Auditer Agent"
-)
-graph.add_edge("Diagnosis Builder and Auditer Agent", END)
+
+## Nothing but UpdateConfidenceMetrics was permitted: the local engine suffices
+def rescoring_only(meta: DiagnosisAuditerMeta) -> bool:
+    return GRAPH_LOCAL_RESCORING and set(meta.allowed_actions) == {
+        "UpdateConfidenceMetrics"
+    }
+
+
+## Only the auditors the differential agent asked for get scheduled
+def route_to_auditors(state: MiniCDSSState) -> list[str]:
+    output = state.differential_diagnosis_output
+    if output is None:
+        return [END]
+
+    targets = []
+    if output.evidence_auditer_meta.should_run:
+        targets.append(EVIDENCE_AUDIT_NODE)
+    if output.diagnosis_auditer_meta.should_run:
+        targets.append(
+            DIAGNOSIS_RESCORE_NODE
+            if rescoring_only(output.diagnosis_auditer_meta)
+            else DIAGNOSIS_AUDIT_NODE
+        )
+    return targets or [END]
+
+
+def build_graph(auditor_mode: Literal["parallel", "sequential"] = GRAPH_AUDITOR_MODE):
+    # Create the graph
+    graph = StateGraph(MiniCDSSState)
+
+    # Build the Nodes
+    graph.add_node(
+        DIFFERENTIAL_NODE,
+        differential_diagnosis_node,
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+    graph.add_node(
+        EVIDENCE_AUDIT_NODE,
+        evidence_audit_node,
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+    graph.add_node(
+        DIAGNOSIS_AUDIT_NODE,
+        diagnosis_audit_node,
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+    graph.add_node(DIAGNOSIS_RESCORE_NODE, diagnosis_rescore_node)
+
+    # Connect the Edges
+    graph.add_edge(START, DIFFERENTIAL_NODE)
+    if auditor_mode == "parallel":
+        ## Both auditors only read the differential output and prior state, so the
+        ## requested ones run in the same superstep; the run ends once they finish.
+        graph.add_conditional_edges(
+            DIFFERENTIAL_NODE,
+            route_to_auditors,
+            [EVIDENCE_AUDIT_NODE, DIAGNOSIS_AUDIT_NODE, DIAGNOSIS_RESCORE_NODE, END],
+        )
+        graph.add_edge(EVIDENCE_AUDIT_NODE, END)
+    else:
+        graph.add_conditional_edges(
+            DIFFERENTIAL_NODE,
+            lambda state: route_to_auditors(state)[0],
+            [EVIDENCE_AUDIT_NODE, DIAGNOSIS_AUDIT_NODE, DIAGNOSIS_RESCORE_NODE, END],
+        )
+        graph.add_conditional_edges(
+            EVIDENCE_AUDIT_NODE,
+            lambda state: next(
+                (t for t in route_to_auditors(state) if t != EVIDENCE_AUDIT_NODE), END
+            ),
+            [DIAGNOSIS_AUDIT_NODE, DIAGNOSIS_RESCORE_NODE, END],
+        )
+    graph.add_edge(DIAGNOSIS_AUDIT_NODE, END)
+    graph.add_edge(DIAGNOSIS_RESCORE_NODE, END)
+
+    return graph
+
+
+## State is checkpointed in Redis after every node, keyed by session id
+compiled_graph = build_graph().compile(checkpointer=RedisCheckpointSaver())
+
+
+def session_config(session_id: str, **configurable) -> RunnableConfig:
+    return {"configurable": {"thread_id": session_id, **configurable}}
 
 
-compiled_graph = graph.compile()
+## Starts a run from `state`, or (state=None) resumes the session's last
+## interrupted run from its latest checkpoint without redoing finished nodes
+async def run_session_graph(
+    session_id: str, state: MiniCDSSState | None = None, **configurable
+):
+    return await compiled_graph.ainvoke(
+        state, session_config(session_id, **configurable)
+    )
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime
+from redis.exceptions import LockError, ResponseError
+from app.core.config import (
+    GRAPH_JOB_PARTITIONS,
+    GRAPH_WORKER_CONCURRENCY,
+    GRAPH_WORKER_LEASE_SECONDS,
+    GRAPH_WORKER_POLL_SECONDS,
+)
+from app.models.graph import MiniCDSSState
+from app.models.jobs import FINISHED_STATUSES
+from app.redis.client import get_async_client, close_async_connection
+from app.repositories.jobs import (
+    CANCEL_CHANNEL,
+    find_job_by_id,
+    is_cancel_requested,
+    stream_key,
+    update_job,
+)
+from app.workflow.graph import DeadlineExceeded, compiled_graph, session_config
+from app.workflow.events import stream_session_graph
+from app.llm.builder import close_providers
+
+WORKER_GROUP = "graph-workers"
+
+
+###########################################################################
+# Per-session ordering: a session always maps to the same partition stream,
+# and a partition is drained by whichever worker holds its Redis lease, one
+# job at a time. A crashed owner's unacked entries are reclaimed by the next
+# lease holder before anything newer is read.
+###########################################################################
+class GraphWorkerPool:
+    def __init__(
+        self,
+        concurrency: int = GRAPH_WORKER_CONCURRENCY,
+        lease_seconds: float = GRAPH_WORKER_LEASE_SECONDS,
+        poll_seconds: float = GRAPH_WORKER_POLL_SECONDS,
+    ):
+        self.concurrency = concurrency
+        self.partitions = GRAPH_JOB_PARTITIONS  # must match the enqueue side
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.tasks: list[asyncio.Task] = []
+        self.running: dict[str, asyncio.Task] = {}  # job id -> graph run
+
+    async def start(self):
+        if self.concurrency <= 0 or self.tasks:
+            return
+        client = get_async_client()
+        for partition in range(self.partitions):
+            try:
+                await client.xgroup_create(
+                    stream_key(partition), WORKER_GROUP, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self.tasks = [
+            asyncio.create_task(self._work(index)) for index in range(self.concurrency)
+        ]
+        self.tasks.append(asyncio.create_task(self._listen_for_cancels()))
+        print(f"Started {self.concurrency} graph workers ({self.name})")
+
+    async def stop(self):
+        ## Interrupted jobs stay unacked and are resumed by the next lease holder
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _listen_for_cancels(self):
+        pubsub = get_async_client().pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(CANCEL_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if run := self.running.get(message["data"]):
+                    run.cancel()
+        finally:
+            await pubsub.aclose()
+
+    async def _work(self, index: int):
+        consumer = f"{self.name}-{index}"
+        while True:
+            busy = False
+            for offset in range(self.partitions):
+                partition = (index + offset) % self.partitions
+                try:
+                    busy |= await self._drain(partition, consumer)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(
+                        f"Graph worker {consumer} failed on partition {partition}: {e}"
+                    )
+            if not busy:
+                await asyncio.sleep(self.poll_seconds)
+
+    ## Returns once the lease is lost. Failed extends are retried while the lease
+    ## is still valid; LockError means another worker already owns it
+    async def _keep_lease(self, lease):
+        expires = time.monotonic() + self.lease_seconds
+        delay = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await lease.extend(self.lease_seconds, replace_ttl=True)
+            except LockError as e:
+                print(f"Lease {lease.name} was lost: {e}")
+                return
+            except Exception as e:
+                delay = self.lease_seconds / 10
+                if time.monotonic() + delay >= expires:
+                    print(f"Lease {lease.name} could not be extended: {e}")
+                    return
+                print(f"Extending lease {lease.name} failed, retrying: {e}")
+                continue
+            expires = time.monotonic() + self.lease_seconds
+            delay = self.lease_seconds / 3
+
+    async def _drain(self, partition: int, consumer: str) -> bool:
+        client = get_async_client()
+        stream = stream_key(partition)
+        lease = client.lock(
+            f"{stream}:lease",
+            timeout=self.lease_seconds,
+            blocking=False,
+            thread_local=False,
+        )
+        if not await lease.acquire():
+            return False
+
+        heartbeat = asyncio.create_task(self._keep_lease(lease))
+        consume = asyncio.create_task(self._consume(stream, consumer))
+        try:
+            await asyncio.wait(
+                {heartbeat, consume}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if consume.done():
+                return consume.result()
+            ## Another worker may reclaim the partition now: stop taking entries and
+            ## leave the current one unacked so the new lease holder resumes it
+            print(f"Graph worker {consumer} lost partition {partition} mid-drain")
+            return True
+        finally:
+            for task in (consume, heartbeat):
+                task.cancel()
+            await asyncio.gather(consume, heartbeat, return_exceptions=True)
+            try:
+                await lease.release()
+            except LockError:
+                pass  ## Lease already expired
+
+    async def _consume(self, stream: str, consumer: str) -> bool:
+        client = get_async_client()
+        processed = 0
+        _, entries, *_ = await client.xautoclaim(
+            stream, WORKER_GROUP, consumer, min_idle_time=0, start_id="0-0"
+        )
+        while True:
+            if not entries:
+                read = await client.xreadgroup(
+                    WORKER_GROUP, consumer, {stream: ">"}, count=1
+                )
+                entries = read[0][1] if read else []
+                if not entries:
+                    return processed > 0
+            for entry_id, fields in entries:
+                await self._execute(fields)
+                await client.xack(stream, WORKER_GROUP, entry_id)
+                processed += 1
+            entries = []
+
+    async def _execute(self, fields: dict):
+        job = await find_job_by_id(fields["job_id"])
+        if job is None or job.status in FINISHED_STATUSES:
+            return  ## Expired, cancelled while queued, or finished before the ack
+
+        job.started_at = datetime.now()
+        if await is_cancel_requested(job.id):
+            job.status = "cancelled"
+            job.finished_at = job.started_at
+            await update_job(job)
+            return
+
+        job.status = "running"
+        job.attempts += 1
+        await update_job(job)
+
+        state = (
+            MiniCDSSState.model_validate_json(fields["state"])
+            if fields["state"]
+            else None
+        )
+        if job.attempts > 1:
+            ## Redelivered: continue this job's checkpointed run instead of restarting
+            snapshot = await compiled_graph.aget_state(session_config(job.ses_id))
+            if snapshot.next and snapshot.metadata.get("job_id") == job.id:
+                state = None
+
+        progress: dict = {}
+        run = asyncio.create_task(
+            stream_session_graph(
+                job.ses_id,
+                state,
+                progress,
+                job_id=job.id,
+                deadline=time.time() + job.timeout_seconds,
+                stream_partials=job.stream_partials,
+            )
+        )
+        self.running[job.id] = run
+        result = None
+        try:
+            ## Closes the gap between the flag check above and registering the run
+            if await is_cancel_requested(job.id):
+                run.cancel()
+            output = await run
+            result = MiniCDSSState.model_validate(output)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise  ## Worker shutdown: leave the entry unacked for redelivery
+            print(f"Graph job {job.id} for session {job.ses_id} was cancelled")
+            job.status = "cancelled"
+        except DeadlineExceeded as e:
+            print(f"Graph job {job.id} for session {job.ses_id} timed out: {e}")
+            job.status = "timed_out"
+            job.error = str(e)
+        except Exception as e:
+            print(f"Graph job {job.id} for session {job.ses_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+        finally:
+            self.running.pop(job.id, None)
+            run.cancel()
+
+        job.finished_at = datetime.now()
+        job.completed_nodes = list(progress.get("nodes", {}))
+        await update_job(job, result, None if result else progress)
+
+
+graph_workers = GraphWorkerPool()
+
+
+## Standalone worker process: `python -m app.workflow.workers`
+async def main():
+    await graph_workers.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await graph_workers.stop()
+        await close_providers()
+        await close_async_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
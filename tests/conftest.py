@@ -0,0 +1,16 @@
+import os
+
+## app.core.config requires these at import time; the tests never reach the services
+for name, value in {
+    "MONGO_URI": "mongodb://localhost:27017/",
+    "REDIS_URI": "redis://localhost:6379",
+    "DATABASE_NAME": "cdss_test",
+    "ORIGINS": "http://localhost:5173",
+    "GOOGLE_API_KEY": "test",
+    "GROQ_API_KEY": "test",
+    "OLLAMA_MODEL": "test",
+    "GOOGLE_MODEL": "test",
+    "GROQ_MODEL_OSS_20B": "test",
+    "GROQ_MODEL_OSS_120B": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+from app.models.graph import (
+    DiagnosisAuditerMeta,
+    DiagnosisAuditerOutput,
+    DifferentialDiagnosisAgentOutput,
+    EvidenceAuditerMeta,
+    EvidenceAuditerOutput,
+    MiniCDSSState,
+    ReasoningStep,
+)
+import app.workflow.graph as graph
+
+DELAY = 0.3
+
+
+async def carry_diagnosis(**_):
+    return DifferentialDiagnosisAgentOutput(
+        current_reasoning_step=ReasoningStep(thought="t", action_taken="Trigger Both"),
+        evidence_auditer_meta=EvidenceAuditerMeta(should_run=True),
+        diagnosis_auditer_meta=DiagnosisAuditerMeta(should_run=True),
+    )
+
+
+async def audit_evidence(**_):
+    await asyncio.sleep(DELAY)
+    return EvidenceAuditerOutput()
+
+
+async def audit_diagnoses(**_):
+    await asyncio.sleep(DELAY)
+    return DiagnosisAuditerOutput()
+
+
+@pytest.fixture
+def stubbed_agents(monkeypatch):
+    monkeypatch.setattr(graph, "carry_diagnosis", carry_diagnosis)
+    monkeypatch.setattr(graph, "audit_evidence", audit_evidence)
+    monkeypatch.setattr(graph, "audit_diagnoses", audit_diagnoses)
+
+
+def run_seconds(auditor_mode: str) -> tuple[dict, float]:
+    compiled = graph.build_graph(auditor_mode).compile()
+
+    async def run():
+        starttime = time.perf_counter()
+        result = await compiled.ainvoke(MiniCDSSState(initial_patient_notes="note"))
+        return result, time.perf_counter() - starttime
+
+    return asyncio.run(run())
+
+
+def test_parallel_auditors_take_the_slowest_not_the_sum(stubbed_agents):
+    parallel, parallel_seconds = run_seconds("parallel")
+    sequential, sequential_seconds = run_seconds("sequential")
+
+    for result in (parallel, sequential):
+        assert result["evidence_audit_output"] is not None
+        assert result["diagnosis_audit_output"] is not None
+
+    assert parallel_seconds < DELAY * 1.5  ## max(DELAY, DELAY)
+    assert sequential_seconds >= DELAY * 2  ## DELAY + DELAY
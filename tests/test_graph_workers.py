@@ -0,0 +1,79 @@
+import asyncio
+from redis.exceptions import LockNotOwnedError
+import app.workflow.workers as workers
+from app.workflow.workers import GraphWorkerPool
+
+LEASE = 0.3
+
+
+class Lease:
+    name = "graph:jobs:0:lease"
+
+    def __init__(self, failures: list[Exception]):
+        self.failures = failures
+        self.extends = 0
+
+    async def acquire(self):
+        return True
+
+    async def extend(self, *_, **__):
+        self.extends += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def release(self):
+        pass
+
+
+class Client:
+    def __init__(self, lease: Lease):
+        self.lease = lease
+        self.acked: list[str] = []
+
+    def lock(self, *_, **__):
+        return self.lease
+
+    async def xautoclaim(self, *_, **__):
+        return "0-0", [("1-0", {"job_id": "j1"}), ("2-0", {"job_id": "j2"})], []
+
+    async def xreadgroup(self, *_, **__):
+        return []
+
+    async def xack(self, stream, group, entry_id):
+        self.acked.append(entry_id)
+
+
+def test_heartbeat_retries_transient_errors():
+    lease = Lease([ConnectionError("reset"), ConnectionError("reset")])
+    pool = GraphWorkerPool(concurrency=0, lease_seconds=LEASE)
+
+    async def run():
+        heartbeat = asyncio.create_task(pool._keep_lease(lease))
+        await asyncio.sleep(LEASE * 1.5)
+        assert not heartbeat.done()
+        heartbeat.cancel()
+
+    asyncio.run(run())
+    assert lease.extends >= 3
+
+
+def test_lost_lease_stops_the_drain(monkeypatch):
+    client = Client(Lease([LockNotOwnedError("taken")]))
+    monkeypatch.setattr(workers, "get_async_client", lambda: client)
+    pool = GraphWorkerPool(concurrency=0, lease_seconds=LEASE)
+    started: list[str] = []
+    cancelled: list[str] = []
+
+    async def execute(fields):
+        started.append(fields["job_id"])
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(fields["job_id"])
+            raise
+
+    pool._execute = execute
+    assert asyncio.run(asyncio.wait_for(pool._drain(0, "c"), 2)) is True
+    ## The in-flight entry stays unacked for the next lease holder; j2 is never taken
+    assert started == cancelled == ["j1"]
+    assert client.acked == []
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from pydantic import BaseModel
+from app.llm.builder import (
+    GoogleStructuredLLM,
+    GroqStructuredLLM,
+    OllamaStructuredLLM,
+)
+
+DELAY = 0.3
+CALLS = 8
+RAW = '{"value": 1}'
+
+
+class Answer(BaseModel):
+    value: int
+
+
+async def _slow(result):
+    await asyncio.sleep(DELAY)
+    return result
+
+
+## Each provider keeps its real invoke path; only the network client is stubbed
+def groq() -> GroqStructuredLLM:
+    llm = GroqStructuredLLM(api_key="test", model="test")
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=RAW))], usage=None
+    )
+    llm.client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **_: _slow(completion))
+        )
+    )
+    return llm
+
+
+def ollama() -> OllamaStructuredLLM:
+    llm = OllamaStructuredLLM(model="test")
+    response = SimpleNamespace(message=SimpleNamespace(content=RAW))
+    llm.client = SimpleNamespace(chat=lambda **_: _slow(response))
+    return llm
+
+
+def google() -> GoogleStructuredLLM:
+    llm = GoogleStructuredLLM(api_key="test", model="test")
+    response = SimpleNamespace(content=RAW, usage_metadata=None)
+    llm.llm = SimpleNamespace(ainvoke=lambda _: _slow(response))
+    return llm
+
+
+@pytest.mark.parametrize("build", [groq, ollama, google])
+def test_concurrent_calls_overlap(build):
+    llm = build()
+
+    async def run():
+        starttime = time.perf_counter()
+        results = await asyncio.gather(
+            *(llm.invoke(f"prompt {i}", Answer) for i in range(CALLS))
+        )
+        return results, time.perf_counter() - starttime
+
+    results, elapsed = asyncio.run(run())
+
+    assert results == [Answer(value=1)] * CALLS
+    ## Blocking clients would take CALLS * DELAY; overlapping calls take one delay
+    assert elapsed < DELAY * 2
@@ -0,0 +1,55 @@
+import asyncio
+from pydantic import BaseModel
+from app.llm.repair import local_repair, parse_with_repair
+from app.llm.scheduler import ProviderLimits, ProviderQueue, ScheduledLLM
+
+
+class Finding(BaseModel):
+    id: str
+    statement: str
+
+
+class Findings(BaseModel):
+    findings: list[Finding]
+
+
+COMPLETE = '{"findings": [{"id": "E1", "statement": "fever for 3 days"}'
+MID_ITEM = COMPLETE + ', {"id": "E2", "statement": "productive co'
+CORRECTED = (
+    '{"findings": [{"id": "E1", "statement": "fever for 3 days"},'
+    ' {"id": "E2", "statement": "productive cough"}]}'
+)
+
+
+def test_local_repair_only_closes_brackets():
+    repaired = local_repair(COMPLETE, Findings)
+    assert repaired is not None and len(repaired.findings) == 1
+
+    ## Keeping E1 alone would silently lose the item that was cut off
+    assert local_repair(MID_ITEM, Findings) is None
+    assert local_repair(COMPLETE + ', {"id": "E2"', Findings) is None
+
+
+def test_truncated_item_goes_through_the_queue():
+    queue = ProviderQueue("test", ProviderLimits(max_concurrency=1))
+    prompts: list[str] = []
+
+    async def complete(prompt: str) -> str:
+        prompts.append(prompt)
+        return CORRECTED
+
+    class Provider:
+        provider = model = "test"
+
+        async def invoke(self, prompt, output_model, system_prompt=""):
+            return await parse_with_repair(
+                MID_ITEM, output_model, complete, lambda: complete(prompt)
+            )
+
+    llm = ScheduledLLM(Provider(), queue)
+    result = asyncio.run(asyncio.wait_for(llm.invoke("note", Findings), 5))
+
+    assert [f.id for f in result.findings] == ["E1", "E2"]
+    assert len(prompts) == 1 and "productive co" in prompts[0]
+    ## The corrective call took its own slot after the first one was released
+    assert queue.completed == 2 and queue.in_flight == 0